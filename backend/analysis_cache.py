@@ -0,0 +1,36 @@
+"""In-process cache of Gemini spam analyses, keyed by a hash of the normalized comment text"""
+from cachetools import TTLCache
+from typing import Any, Dict, Optional
+import hashlib
+import os
+import threading
+
+# Judol spam is heavily templated, so the same text recurs across videos and batches
+_cache = TTLCache(
+    maxsize=int(os.getenv('ANALYSIS_CACHE_SIZE', 100_000)),
+    ttl=int(os.getenv('ANALYSIS_CACHE_TTL', 86400))
+)
+_lock = threading.Lock()
+
+def prompt_scope(name: str, *prompt_parts: str) -> str:
+    """Versioned cache scope: changing the model or prompt text starts a fresh keyspace"""
+    version = hashlib.blake2b('\0'.join(prompt_parts).encode(), digest_size=8).hexdigest()
+    return f"{name}:{version}"
+
+def normalize(text: str) -> str:
+    """Case- and whitespace-insensitive form of a comment, so trivially varied repeats match"""
+    return ' '.join(text.lower().split())
+
+def key(text: str, scope: str) -> bytes:
+    """Content-address a comment; scope keeps analyses from different prompts apart"""
+    return hashlib.blake2b(f"{scope}\0{normalize(text)}".encode(), digest_size=16).digest()
+
+def get(text: str, scope: str) -> Optional[Dict[str, Any]]:
+    """Return the cached analysis for text, or None"""
+    with _lock:
+        return _cache.get(key(text, scope))
+
+def put(text: str, analysis: Dict[str, Any], scope: str) -> None:
+    """Cache a successful Gemini analysis for text"""
+    with _lock:
+        _cache[key(text, scope)] = analysis
@@ -1,23 +1,36 @@
-from flask import Flask, request, jsonify
-from flask import Flask, request, jsonify, redirect, session
+from flask import Flask, request, redirect, session, g, Response, stream_with_context
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 import logging
-from langgraph_workflow import SpamDetectionWorkflow, SpamDetectionState
+from langgraph_workflow import (
+    SpamDetectionWorkflow, SpamDetectionState, get_gemini_model, get_youtube_client, parse_gemini_json,
+    is_valid_analysis, COMMENT_GENERATION_CONFIG, GEMINI_MODEL_NAME
+)
 from oauth_handler import YouTubeOAuthHandler
-from typing import Dict, Any
+from utils import ojsonify, ORJSONProvider, KeyBatcher
+import analysis_cache
+from typing import Dict, Any, List, Optional
+from cachetools import TTLCache
+import asyncio
+import hashlib
+import re
+import threading
 import time
 import secrets
+import orjson
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app, supports_credentials=True)
 
-# Configure session for OAuth
-app.secret_key = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(16))
+# Configure session for OAuth; the key must be shared by all workers, so there is no random fallback
+app.secret_key = os.getenv('FLASK_SECRET_KEY')
+if not app.secret_key:
+    raise RuntimeError("FLASK_SECRET_KEY must be set (see .env.example)")
 app.config['SESSION_COOKIE_SECURE'] = os.getenv('FLASK_ENV') == 'production'
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
@@ -35,44 +48,98 @@ logger = logging.getLogger(__name__)
 # Initialize workflow
 workflow = SpamDetectionWorkflow()
 
+# YouTube video IDs are 11 URL-safe base64 characters
+_VIDEO_ID_RE = re.compile(r'[A-Za-z0-9_-]{11}')
+
+def _is_valid_video_id(video_id: Any) -> bool:
+    """Check video_id format before spending any API quota on it"""
+    return isinstance(video_id, str) and _VIDEO_ID_RE.fullmatch(video_id) is not None
+
+# Cache authentication lookups so repeated polling doesn't reload credentials every request
+auth_cache = TTLCache(maxsize=4096, ttl=int(os.getenv('AUTH_CACHE_TTL', 60)))
+auth_cache_lock = threading.Lock()
+auth_cache_stats = {'hits': 0, 'misses': 0}
+
+def _auth_token_hash() -> str:
+    """Hash the current access token so raw tokens are never used as cache keys"""
+    token = getattr(oauth_handler.credentials, 'token', None) or ''
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+def _cached_auth_lookup(key: tuple, loader):
+    """Return the cached value for key, calling loader and caching its result on a miss
+    
+    None means the lookup failed (e.g. a transient API error), so it is not cached.
+    """
+    with auth_cache_lock:
+        if key in auth_cache:
+            auth_cache_stats['hits'] += 1
+            return auth_cache[key]
+        auth_cache_stats['misses'] += 1
+    
+    value = loader()
+    if value is not None:
+        with auth_cache_lock:
+            auth_cache[key] = value
+    return value
+
+def _auth_check(token_hash: str) -> bool:
+    """Check authentication status, cached per token for AUTH_CACHE_TTL seconds"""
+    return _cached_auth_lookup(('auth', token_hash), lambda: bool(oauth_handler.is_authenticated()))
+
+def _user_info(token_hash: str) -> Optional[Dict[str, Any]]:
+    """Get authenticated user info, cached per token for AUTH_CACHE_TTL seconds"""
+    return _cached_auth_lookup(('user', token_hash), oauth_handler.get_user_info)
+
+def _is_auth() -> bool:
+    """Check authentication once per request, backed by the cross-request TTL cache"""
+    if 'auth' not in g:
+        g.auth = _auth_check(_auth_token_hash())
+    return g.auth
+
+def _invalidate_auth_cache():
+    """Drop cached authentication results after login or logout"""
+    g.pop('auth', None)
+    with auth_cache_lock:
+        auth_cache.clear()
+
 # OAuth Authentication Routes
 @app.route('/api/auth/status', methods=['GET'])
 def auth_status():
     """Check authentication status"""
     try:
-        if oauth_handler.is_authenticated():
-            user_info = oauth_handler.get_user_info()
-            return jsonify({
+        if _is_auth():
+            user_info = _user_info(_auth_token_hash())
+            return ojsonify({
                 'authenticated': True,
                 'user': user_info
             })
         else:
-            return jsonify({
+            return ojsonify({
                 'authenticated': False,
                 'user': None
             })
     except Exception as e:
         logger.error(f"Auth status error: {e}")
-        return jsonify({
+        return ojsonify({
             'authenticated': False,
             'error': str(e)
-        }), 500
+        }, 500)
 
 @app.route('/api/auth/login', methods=['GET'])
 def auth_login():
-    """Initiate OAuth2 login flow"""
+    """Initiate OAuth2 login flow by redirecting the browser to Google
+    
+    Opened as a top-level navigation (the frontend's login popup), so the session cookie
+    holding the nonce is first-party and comes back with Google's redirect to the callback.
+    """
     try:
-        auth_url = oauth_handler.get_authorization_url()
-        return jsonify({
-            'auth_url': auth_url,
-            'message': 'Redirect to this URL to authenticate'
-        })
+        # The callback only accepts state carrying this session's nonce, once
+        session['oauth_nonce'] = secrets.token_urlsafe(16)
+        auth_url = oauth_handler.get_authorization_url(session['oauth_nonce'])
+        return redirect(auth_url)
     except Exception as e:
         logger.error(f"Auth login error: {e}")
-        return jsonify({
-            'error': 'Failed to initiate authentication',
-            'details': str(e)
-        }), 500
+        return redirect(f"{os.getenv('FRONTEND_URL', 'http://localhost:3000')}/oauth/callback?auth_error=login_failed")
 
 @app.route('/oauth/callback', methods=['GET'])
 def oauth_callback():
@@ -81,6 +148,8 @@ def oauth_callback():
         code = request.args.get('code')
         state = request.args.get('state')
         error = request.args.get('error')
+        # Consumed on first use, so a state value can't complete a second login
+        session_nonce = session.pop('oauth_nonce', None)
         
         if error:
             logger.error(f"OAuth error: {error}")
@@ -90,7 +159,8 @@ def oauth_callback():
             return redirect(f"{os.getenv('FRONTEND_URL', 'http://localhost:3000')}/oauth/callback?auth_error=missing_parameters")
         
         # Handle the callback
-        user_info = oauth_handler.handle_oauth_callback(code, state)
+        user_info = oauth_handler.handle_oauth_callback(code, state, session_nonce)
+        _invalidate_auth_cache()
         
         # Store user info in session
         session['user_authenticated'] = True
@@ -108,196 +178,247 @@ def auth_logout():
     """Logout user"""
     try:
         oauth_handler.logout()
+        _invalidate_auth_cache()
         session.clear()
-        return jsonify({
+        return ojsonify({
             'success': True,
             'message': 'Logged out successfully'
         })
     except Exception as e:
         logger.error(f"Logout error: {e}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': str(e)
-        }), 500
+        }, 500)
 
 @app.route('/api/delete-comment', methods=['POST'])
 def delete_comment():
     """Delete a specific comment"""
     try:
-        if not oauth_handler.is_authenticated():
-            return jsonify({
+        if not _is_auth():
+            return ojsonify({
                 'error': 'Authentication required',
                 'auth_required': True
-            }), 401
+            }, 401)
         
         data = request.get_json()
         if 'comment_id' not in data:
-            return jsonify({'error': 'Missing comment_id'}), 400
+            return ojsonify({'error': 'Missing comment_id'}, 400)
         
         comment_id = data['comment_id']
         success = oauth_handler.delete_comment(comment_id)
         
         if success:
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'message': f'Comment {comment_id} deleted successfully'
             })
         else:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': 'Failed to delete comment'
-            }), 500
+            }, 500)
             
     except Exception as e:
         logger.error(f"Delete comment error: {e}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': str(e)
-        }), 500
+        }, 500)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return ojsonify({
         'status': 'healthy',
         'service': 'YouTube Spam Detector with LangGraph',
         'version': '2.0.0',
-        'timestamp': time.time()
+        'timestamp': time.time(),
+        'auth_cache': {
+            'hits': auth_cache_stats['hits'],
+            'misses': auth_cache_stats['misses']
+        }
     })
 
+def _build_video_state(data: Dict[str, Any]):
+    """Validate a process-video request, returning (initial_state, None) or (None, error_response)"""
+    # Validate required fields
+    required_fields = ['video_id']
+    for field in required_fields:
+        if field not in data:
+            return None, ojsonify({'error': f'Missing required field: {field}'}, 400)
+    
+    # Get API keys from environment variables
+    youtube_api_key = os.getenv('YOUTUBE_API_KEY')
+    gemini_api_key = os.getenv('GEMINI_API_KEY')
+    
+    if not youtube_api_key:
+        return None, ojsonify({'error': 'YouTube API key not configured on server'}, 500)
+    if not gemini_api_key:
+        return None, ojsonify({'error': 'Gemini API key not configured on server'}, 500)
+    
+    # Validate video_id format
+    video_id = data['video_id']
+    if not _is_valid_video_id(video_id):
+        return None, ojsonify({'error': 'Invalid video_id format'}, 400)
+    
+    # Optional parameters with defaults
+    max_results = min(data.get('max_results', 50), 200)  # Cap at 200
+    dry_run = data.get('dry_run', True)
+    
+    # Check if deletion is requested and user is authenticated
+    if not dry_run:
+        if not _is_auth():
+            return None, ojsonify({
+                'error': 'Authentication required for comment deletion',
+                'auth_required': True,
+                'auth_url': '/api/auth/login'
+            }, 401)
+    
+    # Create initial state
+    initial_state: SpamDetectionState = {
+        'video_id': video_id,
+        'youtube_api_key': youtube_api_key,
+        'gemini_api_key': gemini_api_key,
+        'max_results': max_results,
+        'dry_run': dry_run,
+        'comments': [],
+        'analyzed_comments': [],
+        'spam_comments': [],
+        'deleted_comments': [],
+        'errors': [],
+        'processing_stats': {}
+    }
+    return initial_state, None
+
+# Serialized dry-run responses keyed by (video_id, max_results), for UI refreshes of the same video
+response_cache = TTLCache(maxsize=1024, ttl=int(os.getenv('RESPONSE_CACHE_TTL', 300)))
+response_cache_lock = threading.Lock()
+
 @app.route('/api/process-video', methods=['POST'])
 def process_video():
     """Process a YouTube video for spam detection using LangGraph workflow"""
     try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['video_id']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        # Get API keys from environment variables
-        youtube_api_key = os.getenv('YOUTUBE_API_KEY')
-        gemini_api_key = os.getenv('GEMINI_API_KEY')
-        
-        if not youtube_api_key:
-            return jsonify({'error': 'YouTube API key not configured on server'}), 500
-        if not gemini_api_key:
-            return jsonify({'error': 'Gemini API key not configured on server'}), 500
-        
-        # Validate video_id format
-        video_id = data['video_id']
-        if len(video_id) != 11:  # YouTube video IDs are 11 characters
-            return jsonify({'error': 'Invalid video_id format'}), 400
-        
-        # Optional parameters with defaults
-        max_results = min(data.get('max_results', 50), 200)  # Cap at 200
-        dry_run = data.get('dry_run', True)
-        
-        # Check if deletion is requested and user is authenticated
-        if not dry_run:
-            if not oauth_handler.is_authenticated():
-                return jsonify({
-                    'error': 'Authentication required for comment deletion',
-                    'auth_required': True,
-                    'auth_url': '/api/auth/login'
-                }), 401
-        
-        # Create initial state
-        initial_state: SpamDetectionState = {
-            'video_id': video_id,
-            'youtube_api_key': youtube_api_key,
-            'gemini_api_key': gemini_api_key,
-            'max_results': max_results,
-            'dry_run': dry_run,
-            'comments': [],
-            'analyzed_comments': [],
-            'spam_comments': [],
-            'deleted_comments': [],
-            'errors': [],
-            'processing_stats': {}
-        }
+        initial_state, error_response = _build_video_state(request.get_json())
+        if error_response is not None:
+            return error_response
+        video_id = initial_state['video_id']
+        dry_run = initial_state['dry_run']
+        
+        # Only dry runs are cached; real runs moderate comments and must always execute
+        cache_key = (video_id, initial_state['max_results'])
+        if dry_run:
+            with response_cache_lock:
+                cached_body = response_cache.get(cache_key)
+            if cached_body is not None:
+                logger.info(f"Serving cached result for video: {video_id}")
+                return Response(cached_body, mimetype='application/json')
         
         logger.info(f"Starting spam detection for video: {video_id}")
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
         
         # Run the workflow with OAuth handler (workflow will handle dry_run logic)
         logger.info(f"[APP DEBUG] Passing OAuth handler to workflow. Dry run: {dry_run}")
         result = workflow.run(initial_state, oauth_handler)
         
-        processing_time = time.time() - start_time
+        processing_time = (time.monotonic_ns() - start_ns) / 1e9
         result['processing_stats']['total_processing_time'] = round(processing_time, 2)
         
         # Prepare response
-        # Treat moderated comments as deleted for UI (backend only does moderation now)
-        processing_stats = result['processing_stats'].copy()
-        moderated_count = processing_stats.get('moderated_count', 0)
-        processing_stats['deleted_count'] = moderated_count  # Show moderated as deleted
+        # Treat moderated comments as deleted for UI (backend only does moderation now).
+        # The workflow result isn't reused, so its stats are updated in place.
+        processing_stats = result['processing_stats']
+        total_comments = processing_stats.get('total_comments', 0)
+        spam_detected = processing_stats.get('spam_detected', 0)
+        deleted_count = processing_stats.get('moderated_count', 0)  # Show moderated as deleted
+        spam_rate = processing_stats.get('spam_rate_percent', 0)
+        processing_stats['deleted_count'] = deleted_count
         processing_stats['moderated_count'] = 0  # Hide moderation from UI
         
-        response = {
+        summary = {
+            'total_comments_processed': total_comments,
+            'spam_detected': spam_detected,
+            'comments_deleted': deleted_count,
+            'spam_rate': f"{spam_rate}%",
+            'processing_time': f"{processing_time:.2f} seconds"
+        }
+        
+        logger.info(f"Processing completed for video {video_id}: {summary}")
+        
+        body = orjson.dumps({
             'success': True,
             'video_id': video_id,
             'dry_run': dry_run,
             'processing_stats': processing_stats,
             'spam_comments': result['spam_comments'],
             'deleted_comments': result.get('moderated_comments', []),
-            'errors': result['errors']
-        }
-        
-        # Add summary for easier consumption
-        # Use the modified processing_stats that already combines deleted + moderated
-        response['summary'] = {
-            'total_comments_processed': processing_stats.get('total_comments', 0),
-            'spam_detected': processing_stats.get('spam_detected', 0),
-            'comments_deleted': processing_stats.get('deleted_count', 0),  # Already combined
-            'spam_rate': f"{processing_stats.get('spam_rate_percent', 0)}%",
-            'processing_time': f"{processing_time:.2f} seconds"
-        }
-        
-        logger.info(f"Processing completed for video {video_id}: {response['summary']}")
+            'errors': result['errors'],
+            'summary': summary
+        })
+        if dry_run and not result['errors']:
+            with response_cache_lock:
+                response_cache[cache_key] = body
         
-        return jsonify(response)
+        return Response(body, mimetype='application/json')
         
     except Exception as e:
         logger.error(f"API error in process_video: {e}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': str(e),
             'timestamp': time.time()
-        }), 500
+        }, 500)
 
-@app.route('/api/analyze-comment', methods=['POST'])
-def analyze_single_comment():
-    """Analyze a single comment for spam detection"""
+@app.route('/api/process-video/stream', methods=['POST'])
+def process_video_stream():
+    """Process a video and stream progress, spam comments and stats as NDJSON"""
     try:
-        data = request.get_json()
-        
-        if 'comment_text' not in data:
-            return jsonify({'error': 'Missing comment_text'}), 400
-        
-        # Get API key from environment
-        gemini_api_key = os.getenv('GEMINI_API_KEY')
-        if not gemini_api_key:
-            return jsonify({'error': 'Gemini API key not configured'}), 500
-        
-        comment_text = data['comment_text']
-        if len(comment_text.strip()) == 0:
-            return jsonify({'error': 'Comment text cannot be empty'}), 400
-        
-        # Create a minimal workflow state for single comment analysis
-        from langgraph_workflow import SpamDetectionWorkflow
-        import google.generativeai as genai
-        import json
-        
-        genai.configure(api_key=gemini_api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        
-        prompt = f"""
+        initial_state, error_response = _build_video_state(request.get_json())
+        if error_response is not None:
+            return error_response
+    except Exception as e:
+        logger.error(f"API error in process_video_stream: {e}")
+        return ojsonify({'success': False, 'error': str(e), 'timestamp': time.time()}, 500)
+    
+    video_id = initial_state['video_id']
+    dry_run = initial_state['dry_run']
+    
+    def generate():
+        yield orjson.dumps({'type': 'start', 'video_id': video_id, 'dry_run': dry_run}) + b'\n'
+        start_ns = time.monotonic_ns()
+        result = initial_state
+        try:
+            for node, result in workflow.stream(initial_state, oauth_handler):
+                yield orjson.dumps({'type': 'stage', 'stage': node}) + b'\n'
+        except Exception as e:
+            logger.error(f"Streaming workflow error for video {video_id}: {e}")
+            result['errors'].append(f"Workflow error: {str(e)}")
+        
+        for comment in result['spam_comments']:
+            yield orjson.dumps({'type': 'spam_comment', 'comment': comment}) + b'\n'
+        
+        # Same UI convention as /api/process-video: moderated comments are reported as deleted
+        processing_stats = result['processing_stats']
+        processing_stats['total_processing_time'] = round((time.monotonic_ns() - start_ns) / 1e9, 2)
+        processing_stats['deleted_count'] = processing_stats.get('moderated_count', 0)
+        processing_stats['moderated_count'] = 0
+        yield orjson.dumps({
+            'type': 'complete',
+            'success': True,
+            'processing_stats': processing_stats,
+            'deleted_comments': result.get('moderated_comments', []),
+            'errors': result['errors']
+        }) + b'\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Prompt for /api/analyze-comment; only the comment text changes per request
+_SPAM_PROMPT_HEADER = """
 Analyze this comment for online gambling/betting spam (judol/judi online).
 
-Comment: "{comment_text}"
+Comment: \""""
+
+_SPAM_PROMPT_FOOTER = """"
 
 Detection criteria:
 1. Gambling keywords: judi, slot, casino, gacor, maxwin, zeus, pragmatic
@@ -307,7 +428,7 @@ Detection criteria:
 5. Emoji patterns commonly used in spam
 
 Respond with JSON:
-{{
+{
   "is_spam": boolean,
   "confidence": 0.0-1.0,
   "spam_type": "gambling|promotional|suspicious|clean",
@@ -315,13 +436,49 @@ Respond with JSON:
   "detected_patterns": ["list of patterns"],
   "risk_level": "low|medium|high|critical",
   "recommended_action": "ignore|review|delete|ban_user"
-}}
+}
 """
+
+_ANALYZE_COMMENT_SCOPE = analysis_cache.prompt_scope(f"analyze-comment:{GEMINI_MODEL_NAME}", _SPAM_PROMPT_HEADER, _SPAM_PROMPT_FOOTER)
+
+@app.route('/api/analyze-comment', methods=['POST'])
+def analyze_single_comment():
+    """Analyze a single comment for spam detection"""
+    try:
+        data = request.get_json()
         
-        response = model.generate_content(prompt)
-        analysis = json.loads(response.text)
+        if 'comment_text' not in data:
+            return ojsonify({'error': 'Missing comment_text'}, 400)
+        
+        # Get API key from environment
+        gemini_api_key = os.getenv('GEMINI_API_KEY')
+        if not gemini_api_key:
+            return ojsonify({'error': 'Gemini API key not configured'}, 500)
         
-        return jsonify({
+        comment_text = data['comment_text']
+        if len(comment_text.strip()) == 0:
+            return ojsonify({'error': 'Comment text cannot be empty'}, 400)
+        
+        analysis = analysis_cache.get(comment_text, _ANALYZE_COMMENT_SCOPE)
+        if analysis is None:
+            model = get_gemini_model(gemini_api_key)
+            
+            prompt = _SPAM_PROMPT_HEADER + comment_text + _SPAM_PROMPT_FOOTER
+            
+            response = model.generate_content(prompt, generation_config=COMMENT_GENERATION_CONFIG)
+            analysis = parse_gemini_json(response.text)
+            
+            # A malformed verdict would otherwise be served from the cache for a day
+            if not is_valid_analysis(analysis):
+                logger.error(f"Malformed Gemini analysis for comment: {analysis}")
+                return ojsonify({
+                    'success': False,
+                    'error': 'Gemini returned an invalid analysis',
+                    'timestamp': time.time()
+                }, 502)
+            analysis_cache.put(comment_text, analysis, _ANALYZE_COMMENT_SCOPE)
+        
+        return ojsonify({
             'success': True,
             'comment_text': comment_text,
             'analysis': analysis,
@@ -330,11 +487,32 @@ Respond with JSON:
         
     except Exception as e:
         logger.error(f"Comment analysis error: {e}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': str(e),
             'timestamp': time.time()
-        }), 500
+        }, 500)
+
+# Partial response mask: only the video fields /api/video-info returns
+_VIDEO_FIELDS = (
+    'items(id,snippet(title,channelTitle,publishedAt,description,thumbnails/medium/url),'
+    'statistics(viewCount,likeCount,commentCount))'
+)
+
+def _load_videos(video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch snippet and statistics for up to 50 videos with one videos.list call"""
+    youtube = get_youtube_client(os.getenv('YOUTUBE_API_KEY'))
+    video_response = youtube.videos().list(
+        part='snippet,statistics',
+        id=','.join(video_ids),
+        maxResults=len(video_ids),
+        fields=_VIDEO_FIELDS
+    ).execute()
+    # An unknown or private video may come back without 'items' under the fields mask
+    return {video['id']: video for video in video_response.get('items', [])}
+
+# Concurrent /api/video-info requests share one videos.list call
+video_loader = KeyBatcher(_load_videos, window=float(os.getenv('VIDEO_INFO_BATCH_WINDOW_MS', 5)) / 1000)
 
 @app.route('/api/video-info', methods=['POST'])
 def get_video_info():
@@ -343,66 +521,132 @@ def get_video_info():
         data = request.get_json()
         
         if 'video_id' not in data:
-            return jsonify({'error': 'Missing video_id'}), 400
+            return ojsonify({'error': 'Missing video_id'}, 400)
+        
+        if not _is_valid_video_id(data['video_id']):
+            return ojsonify({'error': 'Invalid video_id format'}, 400)
         
         # Get YouTube API key from environment variables
         youtube_api_key = os.getenv('YOUTUBE_API_KEY')
         
         if not youtube_api_key:
-            return jsonify({'error': 'YouTube API key not configured on server'}), 500
-        
-        from googleapiclient.discovery import build
-        
-        youtube = build('youtube', 'v3', developerKey=youtube_api_key)
+            return ojsonify({'error': 'YouTube API key not configured on server'}, 500)
         
         # Get video details
-        video_response = youtube.videos().list(
-            part='snippet,statistics',
-            id=data['video_id']
-        ).execute()
+        video = video_loader.load(data['video_id'])
         
-        if not video_response['items']:
-            return jsonify({'error': 'Video not found'}), 404
+        if video is None:
+            return ojsonify({'error': 'Video not found'}, 404)
         
-        video = video_response['items'][0]
         snippet = video['snippet']
-        statistics = video['statistics']
+        stats_get = video.get('statistics', {}).get
         
-        # Get comment count estimate
-        try:
-            comments_response = youtube.commentThreads().list(
-                part='snippet',
-                videoId=data['video_id'],
-                maxResults=1
-            ).execute()
-            
-            total_comments = int(statistics.get('commentCount', 0))
-        except:
-            total_comments = 0
+        # Comment count comes with the statistics; it is absent when comments are disabled
+        total_comments = int(stats_get('commentCount', 0))
         
+        desc = snippet.get('description', '')
         video_info = {
             'video_id': data['video_id'],
             'title': snippet['title'],
             'channel_title': snippet['channelTitle'],
             'published_at': snippet['publishedAt'],
-            'view_count': int(statistics.get('viewCount', 0)),
-            'like_count': int(statistics.get('likeCount', 0)),
+            'view_count': int(stats_get('viewCount', 0)),
+            'like_count': int(stats_get('likeCount', 0)),
             'comment_count': total_comments,
-            'description': snippet.get('description', '')[:500] + '...' if len(snippet.get('description', '')) > 500 else snippet.get('description', ''),
+            'description': desc[:500] + '...' if len(desc) > 500 else desc,
             'thumbnail_url': snippet['thumbnails']['medium']['url']
         }
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'video_info': video_info
         })
         
     except Exception as e:
         logger.error(f"Video info error: {e}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': str(e)
-        }), 500
+        }, 500)
+
+# Recent dry-run batch results, keyed by (video_id, max_results), so repeated batches skip Gemini
+batch_result_cache = TTLCache(maxsize=1024, ttl=int(os.getenv('BATCH_RESULT_CACHE_TTL', 300)))
+batch_result_cache_lock = threading.Lock()
+
+async def _run_batch(video_ids: List[str], youtube_api_key: str, gemini_api_key: str,
+                     max_results: int, dry_run: bool) -> List[Dict[str, Any]]:
+    """Run the workflow for every video concurrently, bounded by BATCH_CONCURRENCY"""
+    sem = asyncio.Semaphore(int(os.getenv('BATCH_CONCURRENCY', 5)))
+    
+    async def process_one(video_id: str) -> Dict[str, Any]:
+        initial_state: SpamDetectionState = {
+            'video_id': video_id,
+            'youtube_api_key': youtube_api_key,
+            'gemini_api_key': gemini_api_key,
+            'max_results': max_results,
+            'dry_run': dry_run,
+            'comments': [],
+            'analyzed_comments': [],
+            'spam_comments': [],
+            'deleted_comments': [],
+            'errors': [],
+            'processing_stats': {}
+        }
+        
+        # Only dry runs are cached; real runs moderate comments and must always execute
+        cache_key = (video_id, max_results)
+        if dry_run:
+            with batch_result_cache_lock:
+                cached = batch_result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        async with sem:
+            result = await workflow.arun(initial_state, oauth_handler if not dry_run else None)
+        
+        video_result = {
+            'video_id': video_id,
+            'success': True,
+            'processing_stats': result['processing_stats'],
+            'spam_count': len(result['spam_comments']),
+            'deleted_count': len(result['deleted_comments']),
+            'errors': result['errors']
+        }
+        if dry_run and not result['errors']:
+            with batch_result_cache_lock:
+                batch_result_cache[cache_key] = video_result
+        return video_result
+    
+    # Malformed IDs are reported directly without running the workflow, and
+    # duplicate IDs share a single run
+    valid_ids = list(dict.fromkeys(video_id for video_id in video_ids if _is_valid_video_id(video_id)))
+    results = await asyncio.gather(
+        *(process_one(video_id) for video_id in valid_ids),
+        return_exceptions=True
+    )
+    results_by_id = dict(zip(valid_ids, results))
+    
+    batch_results = []
+    for video_id in video_ids:
+        if not _is_valid_video_id(video_id):
+            batch_results.append({
+                'video_id': video_id,
+                'success': False,
+                'error': 'Invalid video_id format'
+            })
+            continue
+        
+        result = results_by_id[video_id]
+        if isinstance(result, Exception):
+            batch_results.append({
+                'video_id': video_id,
+                'success': False,
+                'error': str(result)
+            })
+        else:
+            batch_results.append(result)
+    
+    return batch_results
 
 @app.route('/api/batch-process', methods=['POST'])
 def batch_process_videos():
@@ -413,64 +657,32 @@ def batch_process_videos():
         required_fields = ['video_ids']
         for field in required_fields:
             if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+                return ojsonify({'error': f'Missing required field: {field}'}, 400)
         
         # Get API keys from environment variables
         youtube_api_key = os.getenv('YOUTUBE_API_KEY')
         gemini_api_key = os.getenv('GEMINI_API_KEY')
         
         if not youtube_api_key:
-            return jsonify({'error': 'YouTube API key not configured on server'}), 500
+            return ojsonify({'error': 'YouTube API key not configured on server'}, 500)
         if not gemini_api_key:
-            return jsonify({'error': 'Gemini API key not configured on server'}), 500
+            return ojsonify({'error': 'Gemini API key not configured on server'}, 500)
         
         video_ids = data['video_ids']
         if not isinstance(video_ids, list) or len(video_ids) == 0:
-            return jsonify({'error': 'video_ids must be a non-empty list'}), 400
+            return ojsonify({'error': 'video_ids must be a non-empty list'}, 400)
         
         if len(video_ids) > 10:  # Limit batch size
-            return jsonify({'error': 'Maximum 10 videos per batch'}), 400
+            return ojsonify({'error': 'Maximum 10 videos per batch'}, 400)
         
         max_results = min(data.get('max_results', 50), 100)
         dry_run = data.get('dry_run', True)
         
-        batch_results = []
-        
-        for video_id in video_ids:
-            try:
-                initial_state: SpamDetectionState = {
-                    'video_id': video_id,
-                    'youtube_api_key': youtube_api_key,
-                    'gemini_api_key': gemini_api_key,
-                    'max_results': max_results,
-                    'dry_run': dry_run,
-                    'comments': [],
-                    'analyzed_comments': [],
-                    'spam_comments': [],
-                    'deleted_comments': [],
-                    'errors': [],
-                    'processing_stats': {}
-                }
-                
-                result = workflow.run(initial_state, oauth_handler if not dry_run else None)
-                
-                batch_results.append({
-                    'video_id': video_id,
-                    'success': True,
-                    'processing_stats': result['processing_stats'],
-                    'spam_count': len(result['spam_comments']),
-                    'deleted_count': len(result['deleted_comments']),
-                    'errors': result['errors']
-                })
-                
-            except Exception as e:
-                batch_results.append({
-                    'video_id': video_id,
-                    'success': False,
-                    'error': str(e)
-                })
+        batch_results = asyncio.run(_run_batch(
+            video_ids, youtube_api_key, gemini_api_key, max_results, dry_run
+        ))
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'batch_results': batch_results,
             'total_videos': len(video_ids),
@@ -479,10 +691,10 @@ def batch_process_videos():
         
     except Exception as e:
         logger.error(f"Batch process error: {e}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': str(e)
-        }), 500
+        }, 500)
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5001))
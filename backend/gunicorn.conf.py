@@ -0,0 +1,19 @@
+"""Gunicorn settings for serving the Flask app with threaded workers
+
+Requests spend most of their time waiting on Gemini and the YouTube API, so each
+worker process runs a pool of threads instead of handling one request at a time:
+
+    gunicorn -c gunicorn.conf.py app:app
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+workers = int(os.getenv('GUNICORN_WORKERS', min(multiprocessing.cpu_count(), 4)))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+
+# Processing a large video can take minutes of Gemini calls
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+graceful_timeout = 30
+keepalive = 5
@@ -1,13 +1,357 @@
 from langgraph.graph import Graph, StateGraph, END
-from typing import TypedDict, List, Dict, Any, Optional
+from typing import TypedDict, List, Dict, Any, Iterator, NamedTuple, Optional, Tuple
 import google.generativeai as genai
+from google.generativeai import caching
 from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import datetime
+import functools
 import logging
+import os
+import re
+import threading
 import time
-import json
+import numpy as np
+import orjson
+
+from utils import HttpPool, TokenBucket
+import analysis_cache
+import prefilter
 
 logger = logging.getLogger(__name__)
 
+GEMINI_MODEL_NAME = 'gemini-2.0-flash-exp'
+
+# Concurrent Gemini batches within one workflow run
+GEMINI_MAX_WORKERS = int(os.getenv('GEMINI_MAX_WORKERS', 16))
+
+# Caps in-flight Gemini requests across all concurrent workflow runs
+_gemini_semaphore = threading.Semaphore(int(os.getenv('GEMINI_CONCURRENCY', 8)))
+
+# Caps the Gemini request rate to the project's quota (requests per minute, 0 disables)
+gemini_rate_limiter = TokenBucket(float(os.getenv('GEMINI_RPM', 60)) / 60, capacity=float(os.getenv('GEMINI_BURST', 10)))
+
+# Blocking Google SDK calls made from async nodes run here rather than on the event loop.
+# One sized pool shared by every run, instead of each asyncio.run() loop's small default executor.
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('BLOCKING_IO_THREADS', 32)),
+    thread_name_prefix='google-io'
+)
+
+async def run_blocking(func, *args):
+    """Run a blocking call on the shared I/O pool without stalling the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(_blocking_executor, functools.partial(func, *args))
+
+# Number of comments sent to Gemini in a single prompt
+GEMINI_BATCH_SIZE = int(os.getenv('GEMINI_BATCH_SIZE', 20))
+
+# Comment pages fetched ahead of the analysis that is consuming them
+COMMENT_PAGE_PREFETCH = int(os.getenv('COMMENT_PAGE_PREFETCH', 2))
+
+# Analysis fields every verdict must contain before it is trusted, with their expected types
+_REQUIRED_ANALYSIS_FIELDS = {
+    'is_spam': bool,
+    'confidence': (int, float),
+    'spam_type': str,
+    'risk_level': str,
+    'recommended_action': str
+}
+
+_PROMPT_INTRO = "You are an expert content moderator specializing in detecting online gambling/betting spam in Indonesian comments."
+
+_DETECTION_CRITERIA = """IMPORTANT: Only flag as gambling spam if the comment is clearly promoting or discussing online gambling activities. Regular words like "main" (play), "bagus" (good), "test" should NOT trigger spam detection unless used in clear gambling context.
+
+Consider these criteria:
+1. Specific Gambling Keywords: judi, slot casino, gacor, maxwin, zeus slot, pragmatic play, gates of olympus, bonus deposit, putrispin, jackpot, ironslot
+2. Gambling Actions: main slot, main judi, pola gacor, wd lancar, cuan besar, modal receh
+3. Promotional Language: daftar slot, link alternatif, klik link slot, bonus new member, info slot, promosi slot
+4. Gambling Site Names: dora88, sinar88, jpdewa, pintuslot, luxury777, nagaslot, qq77, momo4d
+5. Context: The comment must be clearly related to gambling/betting activities, not just containing common words
+
+Examples of NOT spam:
+- "test wah bagus" (just testing/commenting)
+- "main game ini seru" (playing regular games)
+- "bagus banget videonya" (complimenting content)
+
+Examples of spam:
+- "main slot di situs gacor"
+- "daftar sekarang bonus 100%"
+- "pola zeus maxwin\""""
+
+_ANALYSIS_FIELDS = """  "is_spam": boolean,
+  "confidence": 0.0-1.0,
+  "spam_type": "gambling|promotional|suspicious|clean",
+  "reason": "detailed explanation",
+  "detected_patterns": ["list of patterns"],
+  "risk_level": "low|medium|high|critical",
+  "recommended_action": "ignore|review|delete|ban_user\""""
+
+# Constrained decoding: Gemini returns JSON matching these schemas instead of free text
+_ANALYSIS_SCHEMA_PROPERTIES = {
+    'is_spam': {'type': 'BOOLEAN'},
+    'confidence': {'type': 'NUMBER'},
+    'spam_type': {'type': 'STRING', 'enum': ['gambling', 'promotional', 'suspicious', 'clean']},
+    'reason': {'type': 'STRING'},
+    'detected_patterns': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+    'risk_level': {'type': 'STRING', 'enum': ['low', 'medium', 'high', 'critical']},
+    'recommended_action': {'type': 'STRING', 'enum': ['ignore', 'review', 'delete', 'ban_user']}
+}
+
+COMMENT_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': {
+        'type': 'OBJECT',
+        'properties': _ANALYSIS_SCHEMA_PROPERTIES,
+        'required': list(_REQUIRED_ANALYSIS_FIELDS)
+    }
+}
+
+BATCH_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': {
+        'type': 'ARRAY',
+        'items': {
+            'type': 'OBJECT',
+            'properties': {'i': {'type': 'INTEGER'}, **_ANALYSIS_SCHEMA_PROPERTIES},
+            'required': ['i', *_REQUIRED_ANALYSIS_FIELDS]
+        }
+    }
+}
+
+class PromptSet(NamedTuple):
+    """Static prompt parts placed around the per-call comment data"""
+    comment_header: str
+    comment_footer: str
+    batch_header: str
+    batch_footer: str
+
+_COMMENT_TASK = """Analyze this comment for gambling/betting spam characteristics:
+Comment: \""""
+
+_COMMENT_RESPONSE = f"""Respond with JSON:
+{{
+{_ANALYSIS_FIELDS}
+}}
+"""
+
+_BATCH_TASK = """Analyze each of the following comments for gambling/betting spam characteristics.
+The comments are a JSON array where "i" is the comment number, "t" the comment text, "a" the author and "l" the like count:
+"""
+
+_BATCH_RESPONSE = f"""Respond with a JSON array containing one object per comment, using the comment number as "i":
+[
+  {{
+  "i": 1,
+{_ANALYSIS_FIELDS}
+  }}
+]
+"""
+
+# Static parts of the single-comment and batch prompts, built once at import
+FULL_PROMPTS = PromptSet(
+    comment_header=f"\n{_PROMPT_INTRO}\n\n{_COMMENT_TASK}",
+    comment_footer=f"\n\n{_DETECTION_CRITERIA}\n\n{_COMMENT_RESPONSE}",
+    batch_header=f"\n{_PROMPT_INTRO}\n\n{_BATCH_TASK}",
+    batch_footer=f"\n{_DETECTION_CRITERIA}\n\n{_BATCH_RESPONSE}"
+)
+
+# With a Gemini context cache the intro and criteria are sent once, as its system instruction
+_SYSTEM_INSTRUCTION = f"{_PROMPT_INTRO}\n\n{_DETECTION_CRITERIA}"
+
+CACHED_PROMPTS = PromptSet(
+    comment_header=_COMMENT_TASK,
+    comment_footer=f"\n\n{_COMMENT_RESPONSE}",
+    batch_header=_BATCH_TASK,
+    batch_footer=f"\n{_BATCH_RESPONSE}"
+)
+
+def build_comment_prompt(comment: Dict[str, Any], prompts: PromptSet = FULL_PROMPTS) -> str:
+    """Fill in the per-comment part of the single-comment prompt"""
+    return (
+        f'{prompts.comment_header}{comment["text"]}"\n'
+        f'Author: {comment.get("author", "")}\n'
+        f'Likes: {comment.get("like_count", 0)}{prompts.comment_footer}'
+    )
+
+def build_batch_prompt(comments: List[Dict[str, Any]], prompts: PromptSet = FULL_PROMPTS) -> str:
+    """Fill in the numbered comment list of the batch prompt"""
+    # JSON-encoding the texts keeps quotes and newlines in comments from breaking the list
+    numbered = orjson.dumps([
+        {'i': i, 't': comment['text'], 'a': comment.get('author', ''), 'l': comment.get('like_count', 0)}
+        for i, comment in enumerate(comments, 1)
+    ]).decode()
+    return prompts.batch_header + numbered + '\n' + prompts.batch_footer
+
+# Cached verdicts are only valid for the model and criteria that produced them
+ANALYSIS_CACHE_SCOPE = analysis_cache.prompt_scope(GEMINI_MODEL_NAME, _PROMPT_INTRO, _DETECTION_CRITERIA, _ANALYSIS_FIELDS)
+
+# Outermost JSON object or array in a response, skipping any code fence or prose around it
+_JSON_PAYLOAD_RE = re.compile(r'\{.*\}|\[.*\]', re.DOTALL)
+
+def is_valid_analysis(analysis: Any) -> bool:
+    """Check that a Gemini verdict has every required field with a usable type"""
+    if not isinstance(analysis, dict):
+        return False
+    for field, expected_type in _REQUIRED_ANALYSIS_FIELDS.items():
+        if not isinstance(analysis.get(field), expected_type):
+            return False
+    return 0.0 <= analysis['confidence'] <= 1.0
+
+def parse_gemini_json(response_text: str) -> Any:
+    """Parse JSON from a Gemini response, tolerating code fences and surrounding prose"""
+    try:
+        # Schema-constrained responses are plain JSON
+        return orjson.loads(response_text)
+    except orjson.JSONDecodeError:
+        match = _JSON_PAYLOAD_RE.search(response_text)
+        if match is None:
+            raise
+        return orjson.loads(match.group())
+
+# Single-comment verdicts stop streaming once Gemini commits to "not spam" below this confidence (0 disables)
+GEMINI_EARLY_EXIT_CONFIDENCE = float(os.getenv('GEMINI_EARLY_EXIT_CONFIDENCE', 0))
+
+_NOT_SPAM_RE = re.compile(r'"is_spam"\s*:\s*false')
+# A confidence followed by its delimiter, so a number still being streamed isn't read early
+_CONFIDENCE_RE = re.compile(r'"confidence"\s*:\s*([0-9.]+)\s*[,}]')
+
+def stream_comment_verdict(model: genai.GenerativeModel, prompt: str) -> Any:
+    """Stream a single-comment verdict, skipping the rest of the output once it is clearly clean"""
+    response_text = ''
+    for chunk in model.generate_content(prompt, generation_config=COMMENT_GENERATION_CONFIG, stream=True):
+        response_text += chunk.text
+        if not _NOT_SPAM_RE.search(response_text):
+            continue
+        match = _CONFIDENCE_RE.search(response_text)
+        if match and float(match.group(1)) < GEMINI_EARLY_EXIT_CONFIDENCE:
+            # Abandoning the iterator ends the stream before the reason and patterns are generated
+            return {
+                'is_spam': False,
+                'confidence': float(match.group(1)),
+                'spam_type': 'clean',
+                'reason': "Gemini found no spam signals",
+                'detected_patterns': [],
+                'risk_level': 'low',
+                'recommended_action': 'ignore'
+            }
+    return parse_gemini_json(response_text)
+
+@functools.lru_cache(maxsize=4)
+def get_gemini_model(api_key: str) -> genai.GenerativeModel:
+    """Configure Gemini and build the model once per API key"""
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+# Opt-in server-side caching of the static instructions; Gemini only caches prompts above
+# a minimum token count, so creation failures fall back to sending the full prompt
+GEMINI_CONTEXT_CACHE = os.getenv('GEMINI_CONTEXT_CACHE', 'false').lower() == 'true'
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', 3600))
+
+_context_cache_models: Dict[str, Tuple[Optional[genai.GenerativeModel], float]] = {}
+_context_cache_lock = threading.Lock()
+
+def _context_cached_model(api_key: str) -> Optional[genai.GenerativeModel]:
+    """Return a model backed by a CachedContent holding the instructions, or None if unavailable"""
+    with _context_cache_lock:
+        model, expires_at = _context_cache_models.get(api_key, (None, 0.0))
+        if time.monotonic() < expires_at:
+            return model
+        
+        get_gemini_model(api_key)  # Makes sure the SDK is configured for this key
+        try:
+            cache = caching.CachedContent.create(
+                model=f'models/{GEMINI_MODEL_NAME}',
+                system_instruction=_SYSTEM_INSTRUCTION,
+                ttl=datetime.timedelta(seconds=GEMINI_CONTEXT_CACHE_TTL)
+            )
+            model = genai.GenerativeModel.from_cached_content(cached_content=cache)
+            logger.info(f"Created Gemini context cache {cache.name}")
+        except Exception as e:
+            logger.warning(f"Gemini context cache unavailable, sending full prompts: {e}")
+            model = None
+        
+        # Recreate shortly before the server-side cache expires; failures are retried on the same schedule
+        _context_cache_models[api_key] = (model, time.monotonic() + GEMINI_CONTEXT_CACHE_TTL * 0.9)
+        return model
+
+def get_analysis_model(api_key: str) -> Tuple[genai.GenerativeModel, PromptSet]:
+    """Pick the model for comment analysis and the prompt parts that go with it"""
+    if GEMINI_CONTEXT_CACHE:
+        model = _context_cached_model(api_key)
+        if model is not None:
+            return model, CACHED_PROMPTS
+    return get_gemini_model(api_key), FULL_PROMPTS
+
+# Warm connections shared by all API-key YouTube requests, so TLS handshakes are amortized
+youtube_http_pool = HttpPool(int(os.getenv('YOUTUBE_HTTP_POOL_SIZE', 16)))
+
+class _PooledHttpRequest(HttpRequest):
+    """HttpRequest that runs on a connection borrowed from the shared pool"""
+    
+    def execute(self, http=None, num_retries=0):
+        if http is not None:
+            return super().execute(http=http, num_retries=num_retries)
+        with youtube_http_pool.checkout() as pooled_http:
+            return super().execute(http=pooled_http, num_retries=num_retries)
+
+def _build_request(http, *args, **kwargs) -> HttpRequest:
+    """Build requests that borrow a pooled Http, since httplib2 connections aren't thread-safe"""
+    return _PooledHttpRequest(http, *args, **kwargs)
+
+@functools.lru_cache(maxsize=4)
+def get_youtube_client(api_key: str):
+    """Build the YouTube Data API client once per API key, using the bundled discovery document"""
+    return build(
+        'youtube', 'v3',
+        developerKey=api_key,
+        cache_discovery=False,
+        static_discovery=True,
+        requestBuilder=_build_request
+    )
+
+# Partial response mask: only the fields _fetch_comment_pages reads, plus the paging token
+_COMMENT_THREAD_FIELDS = (
+    'nextPageToken,'
+    'items(id,snippet/topLevelComment/snippet(textDisplay,authorDisplayName,publishedAt,likeCount,authorChannelId/value))'
+)
+
+# Risk levels and spam types as small integer codes; unknown values map to code 0.
+# Priority score = confidence * 100 + a risk level bonus + a spam type bonus, looked up by code.
+RISK_CODES = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+SPAM_TYPE_CODES = {'clean': 0, 'suspicious': 1, 'promotional': 2, 'gambling': 3}
+
+RISK_LEVELS = tuple(RISK_CODES)
+SPAM_TYPES = tuple(SPAM_TYPE_CODES)
+
+_RISK_BONUS = np.array([0, 10, 30, 50], dtype=np.int32)
+_TYPE_BONUS = np.array([0, 10, 20, 40], dtype=np.int32)
+
+def encode_analyses(analyses: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Pack is_spam, confidence, risk code and spam type code of each analysis into arrays"""
+    count = len(analyses)
+    is_spam = np.fromiter((bool(analysis['is_spam']) for analysis in analyses), np.bool_, count)
+    confidence = np.fromiter((analysis['confidence'] for analysis in analyses), np.float64, count)
+    risk = np.fromiter((RISK_CODES.get(analysis['risk_level'], 0) for analysis in analyses), np.int8, count)
+    spam_type = np.fromiter((SPAM_TYPE_CODES.get(analysis['spam_type'], 0) for analysis in analyses), np.int8, count)
+    return is_spam, confidence, risk, spam_type
+
+def count_codes(codes: np.ndarray, names: Tuple[str, ...]) -> Dict[str, int]:
+    """Occurrences of each code present, keyed by its name"""
+    counts = np.bincount(codes, minlength=len(names)).tolist()
+    return {names[code]: count for code, count in enumerate(counts) if count}
+
+def calculate_priorities(confidence: np.ndarray, risk: np.ndarray, spam_type: np.ndarray) -> np.ndarray:
+    """Priority scores for encoded analyses, computed as whole-array operations"""
+    return (confidence * 100).astype(np.int32) + _RISK_BONUS[risk] + _TYPE_BONUS[spam_type]
+
+def _attach_analysis(comment: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Record an analysis on the comment itself; fetched comments aren't reused after analysis"""
+    comment['analysis'] = analysis
+    comment['analyzed_at'] = time.time()
+    return comment
+
 class SpamDetectionState(TypedDict):
     video_id: str
     youtube_api_key: str
@@ -31,227 +375,277 @@ class SpamDetectionWorkflow:
         workflow = StateGraph(SpamDetectionState)
         
         # Add nodes
-        workflow.add_node("fetch_comments", self.fetch_comments)
-        workflow.add_node("analyze_comments", self.analyze_comments)
+        workflow.add_node("fetch_and_analyze", self.fetch_and_analyze)
         workflow.add_node("filter_spam", self.filter_spam)
         workflow.add_node("delete_spam", self.delete_spam)
         workflow.add_node("generate_report", self.generate_report)
         
         # Add edges
-        workflow.add_edge("fetch_comments", "analyze_comments")
-        workflow.add_edge("analyze_comments", "filter_spam")
+        workflow.add_edge("fetch_and_analyze", "filter_spam")
         workflow.add_edge("filter_spam", "delete_spam")
         workflow.add_edge("delete_spam", "generate_report")
         workflow.add_edge("generate_report", END)
         
         # Set entry point
-        workflow.set_entry_point("fetch_comments")
+        workflow.set_entry_point("fetch_and_analyze")
         
         return workflow.compile()
     
-    def fetch_comments(self, state: SpamDetectionState) -> SpamDetectionState:
-        """Fetch comments from YouTube video"""
-        try:
-            youtube = build('youtube', 'v3', developerKey=state['youtube_api_key'])
-            comments = []
-            
-            request = youtube.commentThreads().list(
-                part='snippet',
-                videoId=state['video_id'],
-                maxResults=min(state['max_results'], 100),
-                order='time'
-            )
-            
-            while request and len(comments) < state['max_results']:
-                response = request.execute()
-                
-                for item in response['items']:
-                    comment = item['snippet']['topLevelComment']['snippet']
-                    comments.append({
-                        'id': item['id'],
-                        'text': comment['textDisplay'],
-                        'author': comment['authorDisplayName'],
-                        'published_at': comment['publishedAt'],
-                        'like_count': comment['likeCount'],
-                        'channel_id': comment.get('authorChannelId', {}).get('value', '')
-                    })
-                
-                request = youtube.commentThreads().list_next(request, response)
+    def _fetch_comment_pages(self, state: SpamDetectionState) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages of comments from YouTube until max_results comments have been fetched"""
+        youtube = get_youtube_client(state['youtube_api_key'])
+        remaining = state['max_results']
+        
+        request = youtube.commentThreads().list(
+            part='snippet',
+            videoId=state['video_id'],
+            maxResults=min(state['max_results'], 100),
+            order='time',
+            fields=_COMMENT_THREAD_FIELDS
+        )
+        
+        while request and remaining > 0:
+            response = request.execute()
             
-            state['comments'] = comments[:state['max_results']]
-            logger.info(f"Fetched {len(state['comments'])} comments")
+            page = []
+            # Under the fields mask a video without comments may come back without 'items'
+            for item in response.get('items', [])[:remaining]:
+                comment = item['snippet']['topLevelComment']['snippet']
+                page.append({
+                    'id': item['id'],
+                    'text': comment['textDisplay'],
+                    'author': comment['authorDisplayName'],
+                    'published_at': comment['publishedAt'],
+                    'like_count': comment['likeCount'],
+                    'channel_id': comment.get('authorChannelId', {}).get('value', '')
+                })
+            remaining -= len(page)
+            yield page
             
+            request = youtube.commentThreads().list_next(request, response)
+    
+    async def _analyze(self, model: genai.GenerativeModel, prompts: PromptSet,
+                       comments: List[Dict[str, Any]], sem: asyncio.Semaphore) -> List[Dict[str, Any]]:
+        """Analyze a list of comments, sending only undecided, uncached ones to Gemini"""
+        # Only ambiguous comments go to Gemini; the pre-filter decides the obvious ones
+        suspects = []
+        analyzed_comments = []
+        for comment in comments:
+            verdict, signals = prefilter.classify(comment['text'])
+            if verdict == prefilter.REVIEW:
+                suspects.append(comment)
+            elif verdict == prefilter.SPAM:
+                analyzed_comments.append(_attach_analysis(comment, prefilter.spam_analysis(signals)))
+            else:
+                analyzed_comments.append(_attach_analysis(comment, prefilter.clean_analysis()))
+        logger.info(f"Pre-filter decided {len(analyzed_comments)} comments, {len(suspects)} need review")
+        
+        # Reuse earlier Gemini verdicts for identical comment text
+        misses = []
+        for comment in suspects:
+            analysis = analysis_cache.get(comment['text'], ANALYSIS_CACHE_SCOPE)
+            if analysis is None:
+                misses.append(comment)
+            else:
+                analyzed_comments.append(_attach_analysis(comment, analysis))
+        
+        # Bots repeat the same text, so only the first comment of each text goes to Gemini
+        duplicates: Dict[str, List[Dict[str, Any]]] = {}
+        unique = []
+        for comment in misses:
+            group = duplicates.setdefault(analysis_cache.normalize(comment['text']), [])
+            if not group:
+                unique.append(comment)
+            group.append(comment)
+        logger.info(f"Analysis cache answered {len(suspects) - len(misses)} comments, sending {len(unique)} unique texts to Gemini")
+        
+        batches = [unique[i:i + GEMINI_BATCH_SIZE] for i in range(0, len(unique), GEMINI_BATCH_SIZE)]
+        
+        # Gemini calls are I/O bound, so run the batches concurrently, bounded per workflow run.
+        # The blocking SDK call runs in a thread; its async client is bound to a single event loop.
+        async def analyze_one(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            async with sem:
+                return await run_blocking(self._analyze_batch, model, prompts, batch)
+        
+        for analyzed_batch in await asyncio.gather(*(analyze_one(batch) for batch in batches)):
+            analyzed_comments.extend(analyzed_batch)
+        
+        # Share each verdict with the repeats of its text
+        for first, *repeats in duplicates.values():
+            for comment in repeats:
+                analyzed_comments.append(_attach_analysis(comment, first['analysis']))
+        
+        return analyzed_comments
+    
+    async def fetch_and_analyze(self, state: SpamDetectionState) -> SpamDetectionState:
+        """Fetch comment pages and analyze each page while the next ones download"""
+        state['comments'] = []
+        state['analyzed_comments'] = []
+        
+        # Bounded hand-off: fetching runs at most COMMENT_PAGE_PREFETCH pages ahead of analysis
+        pages: asyncio.Queue = asyncio.Queue(maxsize=COMMENT_PAGE_PREFETCH)
+        
+        async def produce():
+            try:
+                page_iter = self._fetch_comment_pages(state)
+                while (page := await run_blocking(next, page_iter, None)) is not None:
+                    await pages.put(page)
+            except Exception as e:
+                error_msg = f"Error fetching comments: {str(e)}"
+                logger.error(error_msg)
+                state['errors'].append(error_msg)
+            # Not in a finally: once cancelled, nobody reads the queue and this put could block forever
+            await pages.put(None)
+        
+        analyses: List[asyncio.Future] = []
+        
+        async def consume():
+            model, prompts = await run_blocking(get_analysis_model, state['gemini_api_key'])
+            sem = asyncio.Semaphore(GEMINI_MAX_WORKERS)
+            # Start each page's analysis as soon as it arrives; the shared semaphore bounds
+            # Gemini calls across pages, and gathering keeps results in page order
+            while (page := await pages.get()) is not None:
+                state['comments'].extend(page)
+                analyses.append(asyncio.ensure_future(self._analyze(model, prompts, page, sem)))
+            for analyzed_page in await asyncio.gather(*analyses):
+                state['analyzed_comments'].extend(analyzed_page)
+        
+        producer = asyncio.ensure_future(produce())
+        try:
+            await consume()
+            await producer
         except Exception as e:
-            error_msg = f"Error fetching comments: {str(e)}"
+            # Stop fetching (the producer may be blocked on a full queue) and any page still in Gemini
+            producer.cancel()
+            for analysis in analyses:
+                analysis.cancel()
+            await asyncio.gather(producer, *analyses, return_exceptions=True)
+            
+            error_msg = f"Error in comment analysis: {str(e)}"
             logger.error(error_msg)
             state['errors'].append(error_msg)
+            # A partial comment list without analyses would skew the report
             state['comments'] = []
+            state['analyzed_comments'] = []
         
+        logger.info(f"Fetched {len(state['comments'])} comments, analyzed {len(state['analyzed_comments'])}")
         return state
     
-    def analyze_comments(self, state: SpamDetectionState) -> SpamDetectionState:
-        """Analyze comments using Gemini AI"""
+    def _analyze_batch(self, model: genai.GenerativeModel, prompts: PromptSet,
+                       comments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Analyze several comments with one Gemini call, retrying individually on bad output"""
+        if len(comments) == 1:
+            return [self._analyze_comment(model, prompts, comments[0])]
+        
+        verdicts = {}
         try:
-            genai.configure(api_key=state['gemini_api_key'])
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
+            prompt = build_batch_prompt(comments, prompts)
             
-            analyzed_comments = []
+            # Wait for rate budget first so a throttled call doesn't hold a concurrency slot
+            gemini_rate_limiter.acquire()
+            with _gemini_semaphore:
+                response = model.generate_content(prompt, generation_config=BATCH_GENERATION_CONFIG)
+            items = parse_gemini_json(response.text)
             
-            for comment in state['comments']:
-                try:
-                    # Enhanced prompt for better spam detection
-                    prompt = f"""
-You are an expert content moderator specializing in detecting online gambling/betting spam in Indonesian comments.
-
-Analyze this comment for gambling/betting spam characteristics:
-Comment: "{comment['text']}"
-
-IMPORTANT: Only flag as gambling spam if the comment is clearly promoting or discussing online gambling activities. Regular words like "main" (play), "bagus" (good), "test" should NOT trigger spam detection unless used in clear gambling context.
-
-Consider these criteria:
-1. Specific Gambling Keywords: judi, slot casino, gacor, maxwin, zeus slot, pragmatic play, gates of olympus, bonus deposit, putrispin, jackpot, ironslot
-2. Gambling Actions: main slot, main judi, pola gacor, wd lancar, cuan besar, modal receh
-3. Promotional Language: daftar slot, link alternatif, klik link slot, bonus new member, info slot, promosi slot
-4. Gambling Site Names: dora88, sinar88, jpdewa, pintuslot, luxury777, nagaslot, qq77, momo4d
-5. Context: The comment must be clearly related to gambling/betting activities, not just containing common words
-
-Examples of NOT spam:
-- "test wah bagus" (just testing/commenting)
-- "main game ini seru" (playing regular games)
-- "bagus banget videonya" (complimenting content)
-
-Examples of spam:
-- "main slot di situs gacor"
-- "daftar sekarang bonus 100%"
-- "pola zeus maxwin"
-
-Respond with JSON:
-{{
-  "is_spam": boolean,
-  "confidence": 0.0-1.0,
-  "spam_type": "gambling|promotional|suspicious|clean",
-  "reason": "detailed explanation",
-  "detected_patterns": ["list of patterns"],
-  "risk_level": "low|medium|high|critical",
-  "recommended_action": "ignore|review|delete|ban_user"
-}}
-"""
+            for item in items if isinstance(items, list) else []:
+                # A malformed item only sends its own comment to the per-comment retry
+                if is_valid_analysis(item):
+                    verdicts[str(item.pop('i', ''))] = item
                     
-                    response = model.generate_content(prompt)
-                    response_text = response.text.strip()
-                    
-                    # Try to extract JSON from response
-                    try:
-                        # Look for JSON block in response
-                        if '```json' in response_text:
-                            json_start = response_text.find('```json') + 7
-                            json_end = response_text.find('```', json_start)
-                            json_text = response_text[json_start:json_end].strip()
-                        elif '{' in response_text and '}' in response_text:
-                            json_start = response_text.find('{')
-                            json_end = response_text.rfind('}') + 1
-                            json_text = response_text[json_start:json_end]
-                        else:
-                            json_text = response_text
-                        
-                        analysis = json.loads(json_text)
-                    except json.JSONDecodeError:
-                        # Fallback: create analysis based on keywords
-                        text_lower = comment['text'].lower()
-                        gambling_keywords = [
-                            'judi', 'slot', 'casino', 'gacor', 'maxwin', 'maxxwin', 'zeus', 'pragmatic', 'gates of olympus', 
-                            'bonus deposit', 'putrispin', 'jackpot', 'ironslot', 'main slot', 'main judi', 'main di situs', 
-                            'pola gacor', 'tempat judi', 'selalu menang', 'wd lancar', 'cuan besar', 'modal receh',
-                            'gw jelasin pola', 'gk pernah pakek pola', 'daftar slot', 'link alternatif', 
-                            'langsung gas', 'auto cuan', 'jam hoki', 'gacor pol', 'dora88', 'sinar88', 'jpdewa',
-                            'pintuslot', 'luxury777', 'nagaslot', 'qq77', 'momo4d', 'situs judi', 'situs slot', 
-                            'klik link slot', 'daftar sekarang', 'bonus new member', 'info slot', 
-                            'promosi slot', 'akun slot', 'menang terus', 'deposit murah'
-                        ]
-                        detected_keywords = [kw for kw in gambling_keywords if kw in text_lower]
-                        
-                        is_spam = len(detected_keywords) > 0
-                        confidence = min(len(detected_keywords) * 0.3, 1.0)
-                        
-                        analysis = {
-                            'is_spam': is_spam,
-                            'confidence': confidence,
-                            'spam_type': 'gambling' if is_spam else 'clean',
-                            'reason': f"Keyword-based detection. Found: {detected_keywords}" if is_spam else "No gambling keywords detected",
-                            'detected_patterns': detected_keywords,
-                            'risk_level': 'high' if confidence > 0.7 else 'medium' if confidence > 0.3 else 'low',
-                            'recommended_action': 'delete' if confidence > 0.7 else 'review' if confidence > 0.3 else 'ignore'
-                        }
-                    
-                    analyzed_comment = {
-                        **comment,
-                        'analysis': analysis,
-                        'analyzed_at': time.time()
-                    }
-                    
-                    analyzed_comments.append(analyzed_comment)
-                    
-                    # Rate limiting
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    logger.error(f"Error analyzing comment {comment['id']}: {e}")
-                    analyzed_comment = {
-                        **comment,
-                        'analysis': {
-                            'is_spam': False,
-                            'confidence': 0.0,
-                            'spam_type': 'error',
-                            'reason': f"Analysis failed: {str(e)}",
-                            'detected_patterns': [],
-                            'risk_level': 'low',
-                            'recommended_action': 'ignore'
-                        },
-                        'analyzed_at': time.time()
-                    }
-                    analyzed_comments.append(analyzed_comment)
-            
-            state['analyzed_comments'] = analyzed_comments
-            logger.info(f"Analyzed {len(analyzed_comments)} comments")
-            
         except Exception as e:
-            error_msg = f"Error in comment analysis: {str(e)}"
-            logger.error(error_msg)
-            state['errors'].append(error_msg)
-            state['analyzed_comments'] = []
+            logger.warning(f"Batch analysis of {len(comments)} comments failed, retrying individually: {e}")
         
-        return state
+        analyzed_comments = []
+        for i, comment in enumerate(comments, 1):
+            analysis = verdicts.get(str(i))
+            if analysis is None:
+                analyzed_comments.append(self._analyze_comment(model, prompts, comment))
+            else:
+                analysis_cache.put(comment['text'], analysis, ANALYSIS_CACHE_SCOPE)
+                analyzed_comments.append(_attach_analysis(comment, analysis))
+        
+        return analyzed_comments
     
-    def filter_spam(self, state: SpamDetectionState) -> SpamDetectionState:
-        """Filter and categorize spam comments"""
+    def _analyze_comment(self, model: genai.GenerativeModel, prompts: PromptSet,
+                         comment: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze a single comment with Gemini, falling back to keyword detection"""
         try:
-            all_comments = []
-            spam_count = 0
-            high_confidence_spam_count = 0
+            # Enhanced prompt for better spam detection
+            prompt = build_comment_prompt(comment, prompts)
             
-            for comment in state['analyzed_comments']:
-                analysis = comment['analysis']
-                
-                # Add all comments to the list (both spam and clean)
-                processed_comment = {
-                    **comment,
-                    'spam_category': analysis['spam_type'],
-                    'priority': self._calculate_priority(analysis),
-                    'action_recommended': analysis['recommended_action']
-                }
+            # Wait for rate budget first so a throttled call doesn't hold a concurrency slot
+            gemini_rate_limiter.acquire()
+            
+            # Try to extract JSON from response
+            try:
+                with _gemini_semaphore:
+                    if GEMINI_EARLY_EXIT_CONFIDENCE > 0:
+                        analysis = stream_comment_verdict(model, prompt)
+                    else:
+                        response = model.generate_content(prompt, generation_config=COMMENT_GENERATION_CONFIG)
+                        analysis = parse_gemini_json(response.text)
+                if not is_valid_analysis(analysis):
+                    raise ValueError("Gemini response is missing required analysis fields")
+                analysis_cache.put(comment['text'], analysis, ANALYSIS_CACHE_SCOPE)
+            except (orjson.JSONDecodeError, ValueError):
+                # Fallback: create analysis based on keywords
+                detected_keywords = prefilter.keyword_hits(comment['text'])
                 
-                all_comments.append(processed_comment)
+                is_spam = len(detected_keywords) > 0
+                confidence = min(len(detected_keywords) * 0.3, 1.0)
                 
-                # Count spam comments
-                if analysis['is_spam']:
-                    spam_count += 1
-                    # Count high-confidence gambling spam (what will actually be deleted)
-                    if (analysis['confidence'] > 0.7 and 
-                        analysis['spam_type'] == 'gambling'):
-                        high_confidence_spam_count += 1
+                analysis = {
+                    'is_spam': is_spam,
+                    'confidence': confidence,
+                    'spam_type': 'gambling' if is_spam else 'clean',
+                    'reason': f"Keyword-based detection. Found: {detected_keywords}" if is_spam else "No gambling keywords detected",
+                    'detected_patterns': detected_keywords,
+                    'risk_level': 'high' if confidence > 0.7 else 'medium' if confidence > 0.3 else 'low',
+                    'recommended_action': 'delete' if confidence > 0.7 else 'review' if confidence > 0.3 else 'ignore'
+                }
             
-            # Sort by priority (highest first)
-            all_comments.sort(key=lambda x: x['priority'], reverse=True)
+            return _attach_analysis(comment, analysis)
+            
+        except Exception as e:
+            logger.error(f"Error analyzing comment {comment['id']}: {e}")
+            return _attach_analysis(comment, {
+                'is_spam': False,
+                'confidence': 0.0,
+                'spam_type': 'error',
+                'reason': f"Analysis failed: {str(e)}",
+                'detected_patterns': [],
+                'risk_level': 'low',
+                'recommended_action': 'ignore'
+            })
+    
+    def filter_spam(self, state: SpamDetectionState) -> SpamDetectionState:
+        """Filter and categorize spam comments"""
+        try:
+            analyzed_comments = state['analyzed_comments']
+            analyses = [comment['analysis'] for comment in analyzed_comments]
+            
+            # Column arrays of the verdicts, so counting and ranking are whole-array operations
+            is_spam, confidence, risk, spam_type = encode_analyses(analyses)
+            
+            # Count spam comments, and high-confidence gambling spam (what will actually be deleted)
+            spam_count = int(np.count_nonzero(is_spam))
+            high_confidence_spam_count = int(np.count_nonzero(
+                is_spam & (confidence > 0.7) & (spam_type == SPAM_TYPE_CODES['gambling'])
+            ))
+            
+            # Priorities for every comment at once, then a stable highest-first ordering
+            priorities = calculate_priorities(confidence, risk, spam_type)
+            order = np.argsort(-priorities, kind='stable')
+            priorities = priorities.tolist()
+            
+            # Add all comments to the list (both spam and clean), annotating them in place
+            all_comments = []
+            for i in order.tolist():
+                comment = analyzed_comments[i]
+                comment['spam_category'] = analyses[i]['spam_type']
+                comment['priority'] = priorities[i]
+                comment['action_recommended'] = analyses[i]['recommended_action']
+                all_comments.append(comment)
             
             # Store all comments in spam_comments (this is what frontend expects)
             state['spam_comments'] = all_comments
@@ -275,7 +669,7 @@ Respond with JSON:
         
         # Get OAuth handler from state
         oauth_handler = state.get('oauth_handler')
-        logger.info(f"[WORKFLOW DEBUG] OAuth handler exists: {oauth_handler is not None}")
+        logger.debug("[WORKFLOW DEBUG] OAuth handler exists: %s", oauth_handler is not None)
         
         if not oauth_handler:
             error_msg = "OAuth handler not available for comment deletion"
@@ -284,9 +678,9 @@ Respond with JSON:
             state['deleted_comments'] = []
             return state
             
-        logger.info("[WORKFLOW DEBUG] Checking OAuth authentication status...")
+        logger.debug("[WORKFLOW DEBUG] Checking OAuth authentication status...")
         auth_status = oauth_handler.is_authenticated()
-        logger.info(f"[WORKFLOW DEBUG] OAuth authentication status: {auth_status}")
+        logger.debug("[WORKFLOW DEBUG] OAuth authentication status: %s", auth_status)
         
         if not auth_status:
             error_msg = "OAuth authentication required for comment deletion"
@@ -305,59 +699,54 @@ Respond with JSON:
             return state
         
         user_channel_id = user_info['channel_id']
-        logger.info(f"[WORKFLOW DEBUG] Authenticated user channel ID: {user_channel_id}")
+        logger.debug("[WORKFLOW DEBUG] Authenticated user channel ID: %s", user_channel_id)
         
         try:
-            processed_comments = 0
+            to_moderate = []
             
             for comment in state['spam_comments']:
-                try:
-                    # Delete spam comments with high confidence (any type)
-                    # Also log what we're checking for debugging
-                    is_spam = comment['analysis']['is_spam']
-                    spam_type = comment['analysis']['spam_type']
-                    confidence = comment['analysis']['confidence']
-                    
-                    logger.info(f"[DELETE DEBUG] Comment {comment['id']}: is_spam={is_spam}, type={spam_type}, confidence={confidence}")
-                    
-                    # Process high-confidence spam of any type - use moderation for all comments
-                    if (is_spam and confidence > 0.7):
-                        logger.info(f"[MODERATE DEBUG] Attempting to moderate comment {comment['id']} (type: {spam_type}, confidence: {confidence})")
-                        
-                        moderation_success = oauth_handler.moderate_comment(
-                            comment['id'], 
-                            moderation_status='rejected',
-                            ban_author=True  # Ban repeat spam offenders
-                        )
-                        if moderation_success:
-                            logger.info(f"Successfully moderated spam comment {comment['id']} as rejected and banned author")
-                            # Track moderated comments (treated as deleted for UI)
-                            if 'moderated_comments' not in state:
-                                state['moderated_comments'] = []
-                            state['moderated_comments'].append(comment['id'])
-                            logger.info(f"[STATE DEBUG] Added comment {comment['id']} to moderated_comments. Current list: {state['moderated_comments']}")
-                            logger.info(f"[STATE DEBUG] State keys: {list(state.keys())}")
-                            logger.info(f"[STATE DEBUG] moderated_comments length: {len(state['moderated_comments'])}")
-                        else:
-                            logger.info(f"Comment {comment['id']} could not be moderated (likely due to YouTube policy restrictions)")
-                        
-                        # Rate limiting
-                        time.sleep(1)
-                        processed_comments += 1
-                    else:
-                        logger.info(f"[MODERATE DEBUG] Skipping comment {comment['id']}: not high-confidence spam (confidence: {confidence})")
-                        
-                except Exception as e:
-                    error_msg = f"Failed to moderate comment {comment['id']}: {str(e)}"
-                    logger.error(error_msg)
-                    state['errors'].append(error_msg)
+                # Delete spam comments with high confidence (any type)
+                # Also log what we're checking for debugging
+                is_spam = comment['analysis']['is_spam']
+                spam_type = comment['analysis']['spam_type']
+                confidence = comment['analysis']['confidence']
+                
+                logger.debug("[DELETE DEBUG] Comment %s: is_spam=%s, type=%s, confidence=%s", comment['id'], is_spam, spam_type, confidence)
+                
+                # Process high-confidence spam of any type - use moderation for all comments
+                if (is_spam and confidence > 0.7):
+                    logger.debug("[MODERATE DEBUG] Queueing comment %s for moderation (type: %s, confidence: %s)", comment['id'], spam_type, confidence)
+                    to_moderate.append(comment['id'])
+                else:
+                    logger.debug("[MODERATE DEBUG] Skipping comment %s: not high-confidence spam (confidence: %s)", comment['id'], confidence)
+            
+            # Moderate in batched HTTP requests instead of one request (and sleep) per comment
+            moderation_results = oauth_handler.moderate_comments_batch(
+                to_moderate,
+                moderation_status='rejected',
+                ban_author=True  # Ban repeat spam offenders
+            )
+            processed_comments = len(to_moderate)
+            
+            # Track moderated comments (treated as deleted for UI)
+            if 'moderated_comments' not in state:
+                state['moderated_comments'] = []
+            
+            for comment_id in to_moderate:
+                if moderation_results.get(comment_id):
+                    logger.info(f"Successfully moderated spam comment {comment_id} as rejected and banned author")
+                    state['moderated_comments'].append(comment_id)
+                else:
+                    logger.info(f"Comment {comment_id} could not be moderated (likely due to YouTube policy restrictions)")
+            
+            logger.debug("[STATE DEBUG] moderated_comments length: %d", len(state['moderated_comments']))
             
             # Get moderated comments count
             moderated_comments = state.get('moderated_comments', [])
             
             # No deleted comments - only moderated comments (treated as deleted for UI)
             state['deleted_comments'] = []
-            logger.info(f"[WORKFLOW DEBUG] Processed {processed_comments} high-confidence spam comments")
+            logger.debug("[WORKFLOW DEBUG] Processed %d high-confidence spam comments", processed_comments)
             logger.info(f"Successfully moderated {len(moderated_comments)} comments as rejected")
             
         except Exception as e:
@@ -371,21 +760,19 @@ Respond with JSON:
     def generate_report(self, state: SpamDetectionState) -> SpamDetectionState:
         """Generate processing report"""
         try:
-            logger.info(f"[GENERATE_REPORT DEBUG] Received state keys: {list(state.keys())}")
-            logger.info(f"[GENERATE_REPORT DEBUG] moderated_comments in state: {state.get('moderated_comments', 'NOT_FOUND')}")
-            logger.info(f"[GENERATE_REPORT DEBUG] moderated_comments length: {len(state.get('moderated_comments', []))}")
+            logger.debug("[GENERATE_REPORT DEBUG] Received state keys: %s", list(state))
+            logger.debug("[GENERATE_REPORT DEBUG] moderated_comments in state: %s", state.get('moderated_comments', 'NOT_FOUND'))
             total_comments = len(state['comments'])
             analyzed_comments = len(state['analyzed_comments'])
             
-            # Count only actual spam comments
-            actual_spam_comments = [c for c in state['spam_comments'] if c['analysis']['is_spam']]
-            spam_detected = len(actual_spam_comments)
+            # Count only actual spam comments, over column arrays of the verdicts
+            is_spam, confidence, risk, spam_type = encode_analyses([c['analysis'] for c in state['spam_comments']])
+            spam_detected = int(np.count_nonzero(is_spam))
             
             # Count high-confidence gambling spam (what would be deleted)
-            high_confidence_spam = [c for c in actual_spam_comments if 
-                                   c['analysis']['confidence'] > 0.7 and 
-                                   c['analysis']['spam_type'] == 'gambling']
-            high_confidence_count = len(high_confidence_spam)
+            high_confidence_count = int(np.count_nonzero(
+                is_spam & (confidence > 0.7) & (spam_type == SPAM_TYPE_CODES['gambling'])
+            ))
             
             deleted_count = 0  # No deletions - only moderation
             moderated_comments_list = state.get('moderated_comments', [])
@@ -393,9 +780,9 @@ Respond with JSON:
             total_actions = moderated_count  # Only moderated comments
             
             # Debug logging for moderated comments
-            logger.info(f"[REPORT DEBUG] deleted_count: {deleted_count}, moderated_count: {moderated_count}, total_actions: {total_actions}")
-            logger.info(f"[REPORT DEBUG] moderated_comments list: {moderated_comments_list}")
-            logger.info(f"[REPORT DEBUG] deleted_comments list: {state['deleted_comments']}")
+            logger.debug("[REPORT DEBUG] deleted_count: %d, moderated_count: %d, total_actions: %d", deleted_count, moderated_count, total_actions)
+            logger.debug("[REPORT DEBUG] moderated_comments list: %s", moderated_comments_list)
+            logger.debug("[REPORT DEBUG] deleted_comments list: %s", state['deleted_comments'])
             
             # Calculate statistics
             spam_rate = (spam_detected / total_comments * 100) if total_comments > 0 else 0
@@ -403,15 +790,8 @@ Respond with JSON:
             action_rate = (total_actions / high_confidence_count * 100) if high_confidence_count > 0 else 0
             
             # Categorize spam types (only for actual spam)
-            spam_categories = {}
-            risk_levels = {}
-            
-            for comment in actual_spam_comments:
-                spam_type = comment['analysis']['spam_type']
-                risk_level = comment['analysis']['risk_level']
-                
-                spam_categories[spam_type] = spam_categories.get(spam_type, 0) + 1
-                risk_levels[risk_level] = risk_levels.get(risk_level, 0) + 1
+            spam_categories = count_codes(spam_type[is_spam], SPAM_TYPES)
+            risk_levels = count_codes(risk[is_spam], RISK_LEVELS)
             
             state['processing_stats'] = {
                 'total_comments': total_comments,
@@ -439,34 +819,8 @@ Respond with JSON:
         
         return state
     
-    def _calculate_priority(self, analysis: Dict[str, Any]) -> int:
-        """Calculate priority score for spam comments"""
-        priority = 0
-        
-        # Base priority from confidence
-        priority += int(analysis['confidence'] * 100)
-        
-        # Risk level multiplier
-        risk_multipliers = {
-            'critical': 50,
-            'high': 30,
-            'medium': 10,
-            'low': 0
-        }
-        priority += risk_multipliers.get(analysis['risk_level'], 0)
-        
-        # Spam type bonus
-        type_bonus = {
-            'gambling': 40,
-            'promotional': 20,
-            'suspicious': 10
-        }
-        priority += type_bonus.get(analysis['spam_type'], 0)
-        
-        return priority
-    
-    def run(self, initial_state: SpamDetectionState, oauth_handler=None) -> SpamDetectionState:
-        """Run the complete spam detection workflow"""
+    def _prepare_state(self, initial_state: SpamDetectionState, oauth_handler=None) -> None:
+        """Fill in state defaults and attach the OAuth handler for the deletion step"""
         # Initialize state with default values
         initial_state.setdefault('comments', [])
         initial_state.setdefault('analyzed_comments', [])
@@ -478,11 +832,39 @@ Respond with JSON:
         
         # Store OAuth handler in state for deletion step
         initial_state['oauth_handler'] = oauth_handler
+    
+    def run(self, initial_state: SpamDetectionState, oauth_handler=None) -> SpamDetectionState:
+        """Run the complete spam detection workflow"""
+        return asyncio.run(self.arun(initial_state, oauth_handler))
+    
+    def stream(self, initial_state: SpamDetectionState, oauth_handler=None) -> Iterator[Tuple[str, SpamDetectionState]]:
+        """Run the workflow, yielding (node name, state) as each node finishes"""
+        self._prepare_state(initial_state, oauth_handler)
+        
+        # The graph has async nodes, so drive astream on a private loop from this sync generator
+        loop = asyncio.new_event_loop()
+        updates = self.workflow.astream(initial_state)
+        try:
+            while True:
+                try:
+                    update = loop.run_until_complete(updates.__anext__())
+                except StopAsyncIteration:
+                    break
+                for node, state in update.items():
+                    yield node, state
+        finally:
+            loop.run_until_complete(updates.aclose())
+            loop.close()
+    
+    async def arun(self, initial_state: SpamDetectionState, oauth_handler=None) -> SpamDetectionState:
+        """Run the complete spam detection workflow on the caller's event loop"""
+        self._prepare_state(initial_state, oauth_handler)
         
         try:
-            result = self.workflow.invoke(initial_state)
+            # Synchronous nodes are run in LangGraph's executor, keeping the loop free
+            result = await self.workflow.ainvoke(initial_state)
             return result
         except Exception as e:
             logger.error(f"Workflow execution error: {e}")
             initial_state['errors'].append(f"Workflow error: {str(e)}")
-            return initial_state
\ No newline at end of file
+            return initial_state
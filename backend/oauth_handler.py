@@ -1,15 +1,131 @@
-from google.auth.transport.requests import Request
+from google.auth.transport.requests import AuthorizedSession, Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+from googleapiclient.errors import HttpError
+from google_auth_httplib2 import AuthorizedHttp
+from concurrent.futures import Future, ThreadPoolExecutor
+import datetime
+import hashlib
+import hmac
+import httplib2
 import os
-import json
-from typing import Optional, Dict, Any
+import random
+import requests
+import tempfile
+import threading
+import time
+import traceback
+from typing import Optional, Dict, Any, List, Callable, Tuple
 import logging
+import orjson
+
+from utils import HttpPool, TokenBucket
+
+try:
+    import keyring
+    from keyring.errors import PasswordDeleteError
+except ImportError:  # only needed with OAUTH_CREDENTIALS_STORE=keyring
+    keyring = None
+    PasswordDeleteError = None
 
 logger = logging.getLogger(__name__)
 
+# Sub-requests per batch HTTP request (one round-trip), capped at the YouTube API's limit of 100
+BATCH_REQUEST_LIMIT = min(int(os.getenv('YOUTUBE_BATCH_SIZE', 50)), 100)
+
+# Paces comment deletion/moderation writes (per second, 0 disables); a full batch may burst
+youtube_write_limiter = TokenBucket(float(os.getenv('YOUTUBE_WRITE_QPS', 10)), capacity=BATCH_REQUEST_LIMIT)
+
+# Keep-alive connections the shared session keeps for concurrent single comment requests
+REQUEST_CONCURRENCY = int(os.getenv('YOUTUBE_REQUEST_CONCURRENCY', 8))
+
+# YouTube Data API endpoints called directly for single comment writes
+COMMENTS_URL = 'https://youtube.googleapis.com/youtube/v3/comments'
+MODERATE_URL = f'{COMMENTS_URL}/setModerationStatus'
+CHANNELS_URL = 'https://youtube.googleapis.com/youtube/v3/channels'
+
+# channels.list for the signed-in channel, trimmed to the fields the user info reads
+_MY_CHANNEL_PARAMS = {'part': 'snippet', 'mine': 'true', 'fields': 'items(id,snippet(title,thumbnails/default/url))'}
+
+# Seconds to reuse the authenticated channel's info; the channel behind a token never changes
+USER_INFO_CACHE_TTL = int(os.getenv('USER_INFO_CACHE_TTL', 300))
+
+# Where the OAuth token is kept: 'file' (OAUTH_CREDENTIALS_FILE, mode 0600) or 'keyring' (OS keyring)
+CREDENTIALS_STORE = os.getenv('OAUTH_CREDENTIALS_STORE', 'file')
+KEYRING_SERVICE = 'judolslayer'
+KEYRING_USERNAME = 'youtube_oauth'
+
+# Google's OAuth endpoints for a web client; the client ID, secret and redirect URI come from the environment
+_CLIENT_CONFIG_TEMPLATE = {
+    "web": {
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs"
+    }
+}
+
+# Seconds an OAuth state value stays valid between login and callback
+OAUTH_STATE_TTL = int(os.getenv('OAUTH_STATE_TTL', 600))
+
+# Access tokens this close to expiry are refreshed in the background while still in use
+TOKEN_REFRESH_WINDOW = datetime.timedelta(seconds=int(os.getenv('OAUTH_REFRESH_WINDOW', 300)))
+_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='oauth-refresh')
+_token_request = Request(requests.Session())  # keep-alive connection to the token endpoint, used only by that thread
+
+# Batch requests of one moderation pass sent concurrently when there are more comments than fit one batch
+BATCH_CONCURRENCY = int(os.getenv('YOUTUBE_BATCH_CONCURRENCY', 4))
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='youtube-batch')
+
+# Keep-alive connections for those concurrent batch requests, one per in-flight batch
+batch_http_pool = HttpPool(BATCH_CONCURRENCY)
+
+def backoff_delay(base: float, attempt: int, error: Optional[HttpError] = None) -> float:
+    """Seconds to wait before retry attempt + 1, capped at a minute
+    
+    Honors the server's Retry-After header when present (plus up to a second of
+    jitter); otherwise exponential backoff with full jitter, so concurrent callers
+    sharing a quota don't retry in lockstep.
+    """
+    retry_after = error.resp.get('retry-after', '') if error is not None else ''
+    if retry_after.isdigit():
+        return min(int(retry_after) + random.uniform(0, 1), 60.0)
+    return random.uniform(0, min(base * (2 ** attempt), 60.0))
+
+# What to do after a comment write fails with an HttpError
+RETRY = 'retry'    # transient (rate limit, server error): back off and try again
+REAUTH = 'reauth'  # token rejected: reload credentials and try again
+FAIL = 'fail'      # permanent for this comment: retrying only wastes quota and time
+
+# Why permanent failures happen, for the log
+_HTTP_ERROR_HINTS = {
+    'processingFailure': "YouTube policy restrictions (processingFailure). This is normal for some comments.",
+    'banWithoutReject': "the author can only be banned when the comment is rejected.",
+    'operationNotSupported': "moderation is not supported for legacy Google+ comments.",
+    403: "permission denied. User may not own this comment or the channel/video.",
+    404: "comment not found. It may have been already deleted.",
+}
+
+# Outcome by (status, reason); (status, None) covers any reason
+_HTTP_ERROR_OUTCOMES = {
+    (401, None): REAUTH,
+    (403, 'quotaExceeded'): RETRY,
+    (403, 'rateLimitExceeded'): RETRY,
+    (403, 'userRateLimitExceeded'): RETRY,
+    (429, None): RETRY,
+}
+
+def classify_http_error(error: HttpError) -> Tuple[str, int, str]:
+    """Return (RETRY | REAUTH | FAIL, status, reason) for a failed comment write"""
+    status = error.resp.status
+    reason = error.error_details[0].get('reason', 'unknown') if error.error_details else 'unknown'
+    
+    outcome = _HTTP_ERROR_OUTCOMES.get((status, reason)) or _HTTP_ERROR_OUTCOMES.get((status, None))
+    if outcome is None:
+        # Any other client error (bad request, forbidden, not found, ...) fails the same way every time
+        outcome = FAIL if 400 <= status < 500 else RETRY
+    return outcome, status, reason
+
 class YouTubeOAuthHandler:
     """Handle OAuth2 authentication for YouTube API operations"""
     
@@ -20,35 +136,51 @@ class YouTubeOAuthHandler:
         self.scopes = ['https://www.googleapis.com/auth/youtube.force-ssl']
         self.redirect_uri = os.getenv('OAUTH_REDIRECT_URI', 'http://localhost:5001/oauth/callback')
         self.credentials = None
+        # Signs OAuth state values so any worker process can verify a callback without shared storage;
+        # a per-process random key would make callbacks fail on every other worker
+        state_key = os.getenv('FLASK_SECRET_KEY')
+        if not state_key:
+            raise ValueError("FLASK_SECRET_KEY must be set (it signs sessions and OAuth state)")
+        self._state_key = state_key.encode()
+        self._user_info_cache = None  # (access token, fetched at, user info)
+        self._credentials_stamp = None  # credentials file mtime_ns (or keyring entry) behind self.credentials
+        self._refresh_lock = threading.Lock()
+        self._refresh_future: Optional[Future] = None
+        self._local = threading.local()  # per-thread YouTube service
+        self._session: Optional[AuthorizedSession] = None  # shared session for direct REST calls
+        self._client_config = None  # parsed OAuth client config, read once
         
         # Try to load existing credentials on initialization
         self.load_credentials()
         
-    def get_authorization_url(self) -> str:
-        """Get the authorization URL for OAuth2 flow"""
+    def get_authorization_url(self, session_nonce: str) -> str:
+        """Get the authorization URL for OAuth2 flow, bound to the login session's nonce"""
         try:
             flow = self._create_flow()
             
-            authorization_url, state = flow.authorization_url(
+            # Signed state, checked again in the callback
+            authorization_url, _ = flow.authorization_url(
                 access_type='offline',
                 include_granted_scopes='true',
-                prompt='consent'  # Force consent to ensure refresh token
+                prompt='consent',  # Force consent to ensure refresh token
+                state=self._new_oauth_state(session_nonce)
             )
             
-            # Store state for verification
-            self._store_oauth_state(state)
-            
             return authorization_url
             
         except Exception as e:
             logger.error(f"Error generating authorization URL: {e}")
             raise
     
-    def handle_oauth_callback(self, authorization_code: str, state: str) -> Dict[str, Any]:
-        """Handle OAuth2 callback and exchange code for tokens"""
+    def handle_oauth_callback(self, authorization_code: str, state: str, session_nonce: Optional[str]) -> Dict[str, Any]:
+        """Handle OAuth2 callback and exchange code for tokens
+        
+        session_nonce is the nonce the login session was given, consumed by the caller
+        so a state value can only complete one login.
+        """
         try:
             # Verify state
-            if not self._verify_oauth_state(state):
+            if not self._verify_oauth_state(state, session_nonce):
                 raise ValueError("Invalid OAuth state")
             
             flow = self._create_flow()
@@ -62,16 +194,12 @@ class YouTubeOAuthHandler:
             self._store_credentials(self.credentials)
             
             # Get user info
-            youtube = build('youtube', 'v3', credentials=self.credentials)
-            channels_response = youtube.channels().list(
-                part='snippet',
-                mine=True
-            ).execute()
+            channels = self._execute_rest('GET', CHANNELS_URL, _MY_CHANNEL_PARAMS).get('items')
             
             user_info = {
                 'authenticated': True,
-                'channel_id': channels_response['items'][0]['id'] if channels_response['items'] else None,
-                'channel_title': channels_response['items'][0]['snippet']['title'] if channels_response['items'] else None,
+                'channel_id': channels[0]['id'] if channels else None,
+                'channel_title': channels[0]['snippet']['title'] if channels else None,
                 'has_deletion_permission': True
             }
             
@@ -84,153 +212,244 @@ class YouTubeOAuthHandler:
     def load_credentials(self) -> bool:
         """Load stored credentials"""
         try:
-            credentials_file = os.getenv('OAUTH_CREDENTIALS_FILE', 'credentials.json')
-            logger.info(f"[OAUTH DEBUG] Attempting to load credentials from {credentials_file}")
-            
-            if os.path.exists(credentials_file):
-                logger.info(f"[OAUTH DEBUG] Credentials file exists, loading...")
-                self.credentials = Credentials.from_authorized_user_file(credentials_file, self.scopes)
+            logger.debug("[OAUTH DEBUG] Attempting to load credentials from %s", CREDENTIALS_STORE)
+            stamp, stored = self._stored_credentials_stamp()
+            
+            if stamp is not None:
+                # Reparse only when the stored token changed (login, refresh); otherwise keep the loaded credentials
+                if self.credentials is None or stamp != self._credentials_stamp:
+                    logger.debug("[OAUTH DEBUG] Stored credentials changed, loading...")
+                    if stored is None:
+                        with open(os.getenv('OAUTH_CREDENTIALS_FILE', 'credentials.json'), 'rb') as f:
+                            stored = f.read()
+                    self.credentials = Credentials.from_authorized_user_info(orjson.loads(stored), self.scopes)
+                    self._credentials_stamp = stamp
                 
                 if self.credentials:
-                    logger.info(f"[OAUTH DEBUG] Credentials loaded. Valid: {self.credentials.valid}, Expired: {self.credentials.expired}")
-                    logger.info(f"[OAUTH DEBUG] Token: {self.credentials.token[:20]}...")
-                    logger.info(f"[OAUTH DEBUG] Refresh token available: {bool(self.credentials.refresh_token)}")
-                    logger.info(f"[OAUTH DEBUG] Scopes: {self.credentials.scopes}")
+                    # Runs on every authenticated request, so skip building these unless DEBUG is on
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("[OAUTH DEBUG] Credentials loaded. Valid: %s, Expired: %s",
+                                     self.credentials.valid, self.credentials.expired)
+                        logger.debug("[OAUTH DEBUG] Token: %.20s...", self.credentials.token)
+                        logger.debug("[OAUTH DEBUG] Refresh token available: %s", bool(self.credentials.refresh_token))
+                        logger.debug("[OAUTH DEBUG] Scopes: %s", self.credentials.scopes)
                     
                     # Check if we have a refresh token
                     if not self.credentials.refresh_token:
                         logger.warning("[OAUTH DEBUG] No refresh token available. User needs to re-authenticate.")
                         return False
                     
-                    # Refresh if expired
+                    # Refresh if expired, waiting for a refresh that is already in flight
                     if self.credentials.expired:
                         logger.info("[OAUTH DEBUG] Credentials expired, attempting to refresh...")
                         try:
-                            self.credentials.refresh(Request())
-                            self._store_credentials(self.credentials)
+                            self.credentials = self._start_refresh(self.credentials).result()
                             logger.info("[OAUTH DEBUG] Credentials refreshed successfully")
-                            logger.info(f"[OAUTH DEBUG] New token: {self.credentials.token[:20]}...")
+                            logger.debug("[OAUTH DEBUG] New token: %.20s...", self.credentials.token)
                         except Exception as refresh_error:
                             logger.error(f"[OAUTH DEBUG] Failed to refresh credentials: {refresh_error}")
                             return False
+                    elif self._expires_soon(self.credentials):
+                        # Still valid, so keep using it while the next token is fetched off the request path
+                        logger.debug("[OAUTH DEBUG] Credentials expire soon, refreshing in the background")
+                        self._start_refresh(self.credentials)
                     else:
-                        logger.info("[OAUTH DEBUG] Credentials are not expired")
+                        logger.debug("[OAUTH DEBUG] Credentials are not expired")
                 
                 final_result = self.credentials and self.credentials.valid
-                logger.info(f"[OAUTH DEBUG] Final load_credentials result: {final_result}")
+                logger.debug("[OAUTH DEBUG] Final load_credentials result: %s", final_result)
                 return final_result
             else:
-                logger.warning(f"[OAUTH DEBUG] Credentials file {credentials_file} not found")
+                # Logged out (possibly by another worker): forget the token this process still holds
+                logger.warning(f"[OAUTH DEBUG] No stored credentials found ({CREDENTIALS_STORE})")
+                self.credentials = None
+                self._credentials_stamp = None
             
             return False
             
         except Exception as e:
             logger.error(f"[OAUTH DEBUG] Error loading credentials: {e}")
-            import traceback
             logger.error(f"[OAUTH DEBUG] Traceback: {traceback.format_exc()}")
             return False
     
+    def _stored_credentials_stamp(self) -> Tuple[Any, Optional[str]]:
+        """(change stamp, token JSON if already read) of the stored credentials; stamp is None when none are stored"""
+        if CREDENTIALS_STORE == 'keyring':
+            # The stored token JSON is its own change stamp
+            stored = self._get_keyring().get_password(KEYRING_SERVICE, KEYRING_USERNAME)
+            return stored, stored
+        
+        try:
+            return os.stat(os.getenv('OAUTH_CREDENTIALS_FILE', 'credentials.json')).st_mtime_ns, None
+        except FileNotFoundError:
+            return None, None
+    
+    def _start_refresh(self, credentials: Credentials) -> Future:
+        """Refresh credentials on the background thread, joining a refresh already in flight"""
+        with self._refresh_lock:
+            if self._refresh_future is None or self._refresh_future.done():
+                self._refresh_future = _refresh_executor.submit(self._refresh, credentials)
+            return self._refresh_future
+    
+    def _refresh(self, credentials: Credentials) -> Credentials:
+        """Fetch a new access token and persist it"""
+        # Callers that saw the old token can queue up behind a refresh that just finished; skip theirs
+        if credentials.valid and not self._expires_soon(credentials):
+            return credentials
+        
+        try:
+            credentials.refresh(_token_request)
+        except Exception as e:
+            logger.error(f"[OAUTH DEBUG] Token refresh failed: {e}")
+            raise
+        self._store_credentials(credentials)
+        return credentials
+    
+    @staticmethod
+    def _expires_soon(credentials: Credentials) -> bool:
+        """Whether credentials are inside the refresh window (tokens without an expiry never are)"""
+        return bool(credentials.expiry) and credentials.expiry - datetime.datetime.utcnow() < TOKEN_REFRESH_WINDOW
+    
+    def _require_credentials(self) -> Credentials:
+        """Ensure valid credentials are loaded, reloading (and refreshing) them if needed"""
+        if not self.credentials or not self.credentials.valid:
+            logger.info("[OAUTH DEBUG] Credentials invalid, attempting to reload...")
+            if not self.load_credentials():
+                raise ValueError("No valid credentials available. Please authenticate first.")
+        return self.credentials
+    
     def get_authenticated_youtube_service(self):
         """Get authenticated YouTube service for API operations"""
         try:
-            if not self.credentials or not self.credentials.valid:
-                logger.info("[OAUTH DEBUG] Credentials invalid, attempting to reload...")
-                if not self.load_credentials():
-                    raise ValueError("No valid credentials available. Please authenticate first.")
-            
-            logger.info("[OAUTH DEBUG] Building YouTube service with valid credentials")
-            service = build('youtube', 'v3', credentials=self.credentials)
-            logger.info("[OAUTH DEBUG] YouTube service created successfully")
-            return service
+            self._require_credentials()
+            return self._get_service_fast()
             
         except Exception as e:
             logger.error(f"[OAUTH DEBUG] Failed to create YouTube service: {e}")
             raise
     
+    def _get_service_fast(self):
+        """This thread's YouTube service, for callers that already checked is_authenticated"""
+        credentials = self.credentials
+        if credentials is None:
+            raise ValueError("No valid credentials available. Please authenticate first.")
+        
+        # Reuse this thread's service while the credentials object is the same; tokens refresh in
+        # place on it. Per thread, because the service's httplib2.Http is not thread-safe.
+        local = self._local
+        if getattr(local, 'credentials', None) is not credentials:
+            logger.debug("[OAUTH DEBUG] Building YouTube service with valid credentials")
+            # An explicit keep-alive connection with a timeout, kept for the life of this thread's service
+            authorized_http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=30))
+            # The bundled discovery document, so building never fetches it over the network
+            local.service = build('youtube', 'v3', http=authorized_http,
+                                  cache_discovery=False, static_discovery=True)
+            local.credentials = credentials
+            logger.debug("[OAUTH DEBUG] YouTube service created successfully")
+        return local.service
+    
+    def _get_session_fast(self) -> AuthorizedSession:
+        """The session for direct YouTube API requests, for callers that already checked is_authenticated
+        
+        One requests session is shared by all threads: its urllib3 pool keeps up to
+        REQUEST_CONCURRENCY connections alive, so concurrent writes reuse warm TLS
+        connections. It is rebuilt when the credentials object changes.
+        """
+        credentials = self.credentials
+        if credentials is None:
+            raise ValueError("No valid credentials available. Please authenticate first.")
+        
+        session = self._session
+        if session is None or session.credentials is not credentials:
+            session = AuthorizedSession(credentials)
+            session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=REQUEST_CONCURRENCY))
+            self._session = session
+        return session
+    
+    def _execute_rest(self, method: str, url: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """Send a direct YouTube API request and return its JSON body (empty for no content)
+        
+        Callers check is_authenticated (or just stored new credentials) first, so this
+        doesn't validate them again. Raises HttpError like the client library on failure.
+        """
+        response = self._get_session_fast().request(method, url, params=params, timeout=30)
+        if response.status_code >= 400:
+            # httplib2-style response so classify_http_error and backoff_delay work unchanged
+            resp = httplib2.Response({'status': response.status_code, **response.headers})
+            raise HttpError(resp, response.content, uri=url)
+        return orjson.loads(response.content) if response.content else {}
+    
     def delete_comment(self, comment_id: str) -> bool:
         """Delete a YouTube comment using authenticated service with retry logic"""
-        import time
-        from googleapiclient.errors import HttpError
-        
         max_retries = 3
         retry_delay = 1  # seconds
         
         for attempt in range(max_retries):
             try:
-                logger.info(f"[OAUTH DEBUG] delete_comment() attempt {attempt + 1}/{max_retries} for comment_id: {comment_id}")
+                logger.debug("[OAUTH DEBUG] delete_comment() attempt %d/%d for comment_id: %s", attempt + 1, max_retries, comment_id)
                 
                 # Check authentication status before attempting deletion
                 auth_status = self.is_authenticated()
-                logger.info(f"[OAUTH DEBUG] Authentication status before deletion: {auth_status}")
+                logger.debug("[OAUTH DEBUG] Authentication status before deletion: %s", auth_status)
                 
                 if not auth_status:
-                    logger.error(f"[OAUTH DEBUG] Authentication failed, cannot delete comment {comment_id}")
+                    logger.error("[OAUTH DEBUG] Authentication failed, cannot delete comment %s", comment_id)
                     return False
                 
-                youtube = self.get_authenticated_youtube_service()
-                logger.info(f"[OAUTH DEBUG] Got YouTube service, attempting to delete comment {comment_id}")
+                logger.debug("[OAUTH DEBUG] Attempting to delete comment %s", comment_id)
                 
                 # Attempt the deletion
-                youtube.comments().delete(id=comment_id).execute()
-                logger.info(f"[OAUTH DEBUG] Successfully deleted comment: {comment_id}")
+                youtube_write_limiter.acquire()
+                self._execute_rest('DELETE', COMMENTS_URL, {'id': comment_id})
+                logger.debug("[OAUTH DEBUG] Successfully deleted comment: %s", comment_id)
                 return True
                 
             except HttpError as e:
-                error_code = e.resp.status
-                error_reason = e.error_details[0].get('reason', 'unknown') if e.error_details else 'unknown'
-                
-                logger.error(f"[OAUTH DEBUG] HTTP Error {error_code} for comment {comment_id}: {error_reason}")
-                
-                # Handle specific error cases
-                if error_code == 400:
-                    if 'processingFailure' in error_reason:
-                        logger.warning(f"Comment {comment_id} cannot be deleted due to YouTube policy restrictions (processingFailure). This is normal for some comments.")
-                        return False  # Don't retry for processingFailure
-                    else:
-                        logger.error(f"Bad request for comment {comment_id}: {error_reason}")
-                        return False
-                elif error_code == 403:
-                    if 'quotaExceeded' in str(e) or 'rateLimitExceeded' in str(e):
-                        logger.warning(f"Rate limit exceeded for comment {comment_id}, attempt {attempt + 1}/{max_retries}")
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (2 ** attempt))  # Exponential backoff
-                            continue
-                    elif 'forbidden' in str(e).lower():
-                        logger.error(f"Permission denied for comment {comment_id}. User may not own this comment.")
-                        return False
-                elif error_code == 404:
-                    logger.error(f"Comment {comment_id} not found. It may have been already deleted.")
-                    return False
-                elif error_code == 401:
-                    logger.error(f"Authentication error for comment {comment_id}. Token may be expired.")
-                    # Try to refresh credentials and retry
-                    if attempt < max_retries - 1:
-                        self.credentials = None
-                        time.sleep(retry_delay)
-                        continue
-                    return False
-                
-                # For other HTTP errors, retry with backoff
-                if attempt < max_retries - 1:
-                    logger.warning(f"Retrying comment deletion in {retry_delay * (2 ** attempt)} seconds...")
-                    time.sleep(retry_delay * (2 ** attempt))
-                else:
-                    logger.error(f"Failed to delete comment {comment_id} after {max_retries} attempts: HTTP {error_code} - {error_reason}")
+                if not self._retry_after_http_error(e, 'delete', comment_id, attempt, max_retries, retry_delay):
                     return False
                     
             except Exception as e:
-                logger.error(f"[OAUTH DEBUG] Unexpected error deleting comment {comment_id} (attempt {attempt + 1}/{max_retries}): {type(e).__name__}: {e}")
+                logger.error("[OAUTH DEBUG] Unexpected error deleting comment %s (attempt %d/%d): %s: %s",
+                             comment_id, attempt + 1, max_retries, type(e).__name__, e)
                 
                 # For unexpected errors, retry with backoff
                 if attempt < max_retries - 1:
-                    logger.warning(f"Retrying comment deletion in {retry_delay * (2 ** attempt)} seconds...")
-                    time.sleep(retry_delay * (2 ** attempt))
+                    delay = backoff_delay(retry_delay, attempt)
+                    logger.warning(f"Retrying comment deletion in {delay:.1f} seconds...")
+                    time.sleep(delay)
                 else:
                     logger.error(f"Failed to delete comment {comment_id} after {max_retries} attempts due to unexpected error")
                     return False
         
         return False
     
+    def _retry_after_http_error(self, e: HttpError, action: str, comment_id: str,
+                                attempt: int, max_retries: int, retry_delay: float) -> bool:
+        """Log a failed comment write and wait before retrying it; False when it should not be retried"""
+        outcome, error_code, error_reason = classify_http_error(e)
+        logger.error("[OAUTH DEBUG] HTTP Error %s to %s comment %s: %s", error_code, action, comment_id, error_reason)
+        
+        if outcome == FAIL:
+            hint = _HTTP_ERROR_HINTS.get(error_reason) or _HTTP_ERROR_HINTS.get(error_code) or f"HTTP {error_code} - {error_reason}"
+            logger.error(f"Cannot {action} comment {comment_id}: {hint}")
+            return False
+        
+        if attempt >= max_retries - 1:
+            logger.error(f"Failed to {action} comment {comment_id} after {max_retries} attempts: HTTP {error_code} - {error_reason}")
+            return False
+        
+        if outcome == REAUTH:
+            # Drop the rejected token so the next attempt reloads (and refreshes) credentials
+            logger.warning(f"Authentication error for comment {comment_id}. Token may be expired, reloading credentials.")
+            self.credentials = None
+            delay = retry_delay
+        else:
+            delay = backoff_delay(retry_delay, attempt, e)
+            logger.warning(f"Retrying {action} of comment {comment_id} in {delay:.1f} seconds (attempt {attempt + 1}/{max_retries})...")
+        
+        time.sleep(delay)
+        return True
+    
     def moderate_comment(self, comment_id: str, moderation_status: str = 'rejected', ban_author: bool = False) -> bool:
         """Moderate a YouTube comment using setModerationStatus API
         
@@ -242,26 +461,23 @@ class YouTubeOAuthHandler:
         Returns:
             bool: True if moderation was successful, False otherwise
         """
-        import time
-        from googleapiclient.errors import HttpError
-        
         max_retries = 3
         retry_delay = 1  # seconds
         
         for attempt in range(max_retries):
             try:
-                logger.info(f"[OAUTH DEBUG] moderate_comment() attempt {attempt + 1}/{max_retries} for comment_id: {comment_id}, status: {moderation_status}")
+                logger.debug("[OAUTH DEBUG] moderate_comment() attempt %d/%d for comment_id: %s, status: %s",
+                             attempt + 1, max_retries, comment_id, moderation_status)
                 
                 # Check authentication status before attempting moderation
                 auth_status = self.is_authenticated()
-                logger.info(f"[OAUTH DEBUG] Authentication status before moderation: {auth_status}")
+                logger.debug("[OAUTH DEBUG] Authentication status before moderation: %s", auth_status)
                 
                 if not auth_status:
-                    logger.error(f"[OAUTH DEBUG] Authentication failed, cannot moderate comment {comment_id}")
+                    logger.error("[OAUTH DEBUG] Authentication failed, cannot moderate comment %s", comment_id)
                     return False
                 
-                youtube = self.get_authenticated_youtube_service()
-                logger.info(f"[OAUTH DEBUG] Got YouTube service, attempting to moderate comment {comment_id}")
+                logger.debug("[OAUTH DEBUG] Attempting to moderate comment %s", comment_id)
                 
                 # Prepare moderation request
                 request_params = {
@@ -271,94 +487,161 @@ class YouTubeOAuthHandler:
                 
                 # Add banAuthor parameter only if rejecting and ban_author is True
                 if moderation_status == 'rejected' and ban_author:
-                    request_params['banAuthor'] = True
+                    request_params['banAuthor'] = 'true'
                 
                 # Attempt the moderation
-                youtube.comments().setModerationStatus(**request_params).execute()
-                logger.info(f"[OAUTH DEBUG] Successfully moderated comment: {comment_id} to status: {moderation_status}")
+                youtube_write_limiter.acquire()
+                self._execute_rest('POST', MODERATE_URL, request_params)
+                logger.debug("[OAUTH DEBUG] Successfully moderated comment: %s to status: %s", comment_id, moderation_status)
                 return True
                 
             except HttpError as e:
-                error_code = e.resp.status
-                error_reason = e.error_details[0].get('reason', 'unknown') if e.error_details else 'unknown'
-                
-                logger.error(f"[OAUTH DEBUG] HTTP Error {error_code} for comment moderation {comment_id}: {error_reason}")
-                
-                # Handle specific error cases
-                if error_code == 400:
-                    if 'banWithoutReject' in error_reason:
-                        logger.error(f"Cannot ban author without rejecting comment {comment_id}")
-                        return False
-                    elif 'operationNotSupported' in error_reason:
-                        logger.error(f"Moderation not supported for comment {comment_id} (legacy Google+ comment)")
-                        return False
-                    elif 'processingFailure' in error_reason:
-                        logger.warning(f"Comment {comment_id} cannot be moderated due to YouTube policy restrictions (processingFailure)")
-                        return False
-                    else:
-                        logger.error(f"Bad request for comment moderation {comment_id}: {error_reason}")
-                        return False
-                elif error_code == 403:
-                    if 'quotaExceeded' in str(e) or 'rateLimitExceeded' in str(e):
-                        logger.warning(f"Rate limit exceeded for comment moderation {comment_id}, attempt {attempt + 1}/{max_retries}")
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (2 ** attempt))  # Exponential backoff
-                            continue
-                    elif 'forbidden' in str(e).lower():
-                        logger.error(f"Permission denied for comment moderation {comment_id}. User may not be channel/video owner.")
-                        return False
-                elif error_code == 404:
-                    logger.error(f"Comment {comment_id} not found for moderation. It may have been deleted.")
-                    return False
-                elif error_code == 401:
-                    logger.error(f"Authentication error for comment moderation {comment_id}. Token may be expired.")
-                    # Try to refresh credentials and retry
-                    if attempt < max_retries - 1:
-                        self.credentials = None
-                        time.sleep(retry_delay)
-                        continue
-                    return False
-                
-                # For other HTTP errors, retry with backoff
-                if attempt < max_retries - 1:
-                    logger.warning(f"Retrying comment moderation in {retry_delay * (2 ** attempt)} seconds...")
-                    time.sleep(retry_delay * (2 ** attempt))
-                else:
-                    logger.error(f"Failed to moderate comment {comment_id} after {max_retries} attempts: HTTP {error_code} - {error_reason}")
+                if not self._retry_after_http_error(e, 'moderate', comment_id, attempt, max_retries, retry_delay):
                     return False
                     
             except Exception as e:
-                logger.error(f"[OAUTH DEBUG] Unexpected error moderating comment {comment_id} (attempt {attempt + 1}/{max_retries}): {type(e).__name__}: {e}")
+                logger.error("[OAUTH DEBUG] Unexpected error moderating comment %s (attempt %d/%d): %s: %s",
+                             comment_id, attempt + 1, max_retries, type(e).__name__, e)
                 
                 # For unexpected errors, retry with backoff
                 if attempt < max_retries - 1:
-                    logger.warning(f"Retrying comment moderation in {retry_delay * (2 ** attempt)} seconds...")
-                    time.sleep(retry_delay * (2 ** attempt))
+                    delay = backoff_delay(retry_delay, attempt)
+                    logger.warning(f"Retrying comment moderation in {delay:.1f} seconds...")
+                    time.sleep(delay)
                 else:
                     logger.error(f"Failed to moderate comment {comment_id} after {max_retries} attempts due to unexpected error")
                     return False
         
         return False
     
+    def moderate_comments_batch(self, comment_ids: List[str], moderation_status: str = 'rejected', ban_author: bool = False) -> Dict[str, bool]:
+        """Moderate many YouTube comments using batched setModerationStatus requests
+        
+        Args:
+            comment_ids: The IDs of the comments to moderate
+            moderation_status: 'published', 'rejected', or 'heldForReview'
+            ban_author: Whether to ban the comment authors (only valid with 'rejected')
+        
+        Returns:
+            Dict[str, bool]: Moderation success keyed by comment ID
+        """
+        request_params = {'moderationStatus': moderation_status}
+        
+        # Add banAuthor parameter only if rejecting and ban_author is True
+        if moderation_status == 'rejected' and ban_author:
+            request_params['banAuthor'] = True
+        
+        results = self._execute_batched(
+            comment_ids,
+            lambda youtube, comment_id: youtube.comments().setModerationStatus(id=comment_id, **request_params),
+            'moderate'
+        )
+        logger.info(f"[OAUTH DEBUG] Batch moderated {sum(results.values())}/{len(results)} comments to status: {moderation_status}")
+        return results
+    
+    def _execute_batched(self, comment_ids: List[str], make_request: Callable[[Any, str], Any],
+                         action: str) -> Dict[str, bool]:
+        """Send one API request per comment, BATCH_REQUEST_LIMIT of them per HTTP round trip
+        
+        Entries that fail because of rate limiting or server errors are retried with
+        exponential backoff; other failures are not retried.
+        """
+        # Batch request IDs must be unique
+        comment_ids = list(dict.fromkeys(comment_ids))
+        results = {comment_id: False for comment_id in comment_ids}
+        if not comment_ids:
+            return results
+        
+        if not self.is_authenticated():
+            logger.error(f"[OAUTH DEBUG] Authentication failed, cannot {action} {len(comment_ids)} comments")
+            return results
+        
+        youtube = self._get_service_fast()
+        
+        max_retries = 3
+        retry_delay = 1  # seconds
+        pending = comment_ids
+        
+        for attempt in range(max_retries):
+            retry_ids = []
+            retry_errors = []
+            
+            def on_response(request_id, response, exception):
+                if exception is None:
+                    results[request_id] = True
+                    return
+                
+                if isinstance(exception, HttpError) and classify_http_error(exception)[0] == RETRY:
+                    retry_ids.append(request_id)
+                    retry_errors.append(exception)
+                    return
+                
+                logger.error(f"Failed to {action} comment {request_id}: {exception}")
+            
+            def send_batch(chunk: List[str], http=None) -> None:
+                batch = youtube.new_batch_http_request(callback=on_response)
+                for comment_id in chunk:
+                    batch.add(make_request(youtube, comment_id), request_id=comment_id)
+                
+                youtube_write_limiter.acquire(len(chunk))
+                try:
+                    batch.execute(http=http)
+                except Exception as e:
+                    # The whole batch request failed, retry every entry that didn't report back
+                    logger.error(f"[OAUTH DEBUG] Batch {action} request failed: {type(e).__name__}: {e}")
+                    retry_ids.extend(comment_id for comment_id in chunk
+                                     if not results[comment_id] and comment_id not in retry_ids)
+            
+            def send_pooled(chunk: List[str]) -> None:
+                # httplib2.Http is not thread-safe, so each concurrent batch borrows its own connection
+                with batch_http_pool.checkout() as http:
+                    send_batch(chunk, AuthorizedHttp(self.credentials, http=http))
+            
+            chunks = [pending[i:i + BATCH_REQUEST_LIMIT] for i in range(0, len(pending), BATCH_REQUEST_LIMIT)]
+            if len(chunks) == 1:
+                send_batch(chunks[0])
+            else:
+                list(_batch_executor.map(send_pooled, chunks))
+            
+            if not retry_ids:
+                break
+            
+            pending = retry_ids
+            if attempt < max_retries - 1:
+                delay = backoff_delay(retry_delay, attempt, retry_errors[0] if retry_errors else None)
+                logger.warning(f"Retrying {action} of {len(pending)} comments in {delay:.1f} seconds...")
+                time.sleep(delay)
+            else:
+                logger.error(f"Failed to {action} {len(pending)} comments after {max_retries} attempts")
+        
+        return results
+    
     def is_authenticated(self) -> bool:
         """Check if user is authenticated"""
-        logger.info("[OAUTH DEBUG] is_authenticated() called")
+        logger.debug("[OAUTH DEBUG] is_authenticated() called")
         
-        # Always try to load/refresh credentials first
+        # Loaded credentials outside the refresh window need no reparse or refresh, as long as the
+        # stored token is unchanged; the stamp check still catches a logout or login on another worker
+        credentials = self.credentials
+        if (credentials and credentials.valid and credentials.expiry
+                and credentials.expiry - datetime.datetime.utcnow() > TOKEN_REFRESH_WINDOW):
+            try:
+                if self._stored_credentials_stamp()[0] == self._credentials_stamp:
+                    return True
+            except Exception as e:
+                logger.error(f"[OAUTH DEBUG] Error checking stored credentials: {e}")
+                return False
+        
+        # Otherwise load/refresh credentials first
         load_result = self.load_credentials()
-        logger.info(f"[OAUTH DEBUG] load_credentials() returned: {load_result}")
+        logger.debug("[OAUTH DEBUG] load_credentials() returned: %s", load_result)
         
         if not load_result:
             logger.warning("[OAUTH DEBUG] load_credentials() failed, returning False")
             return False
             
-        creds_exist = self.credentials is not None
-        creds_valid = self.credentials.valid if self.credentials else False
-        
-        logger.info(f"[OAUTH DEBUG] Credentials exist: {creds_exist}, Valid: {creds_valid}")
-        
         final_result = self.credentials and self.credentials.valid
-        logger.info(f"[OAUTH DEBUG] is_authenticated() final result: {final_result}")
+        logger.debug("[OAUTH DEBUG] is_authenticated() final result: %s", final_result)
         
         return final_result
     
@@ -368,20 +651,23 @@ class YouTubeOAuthHandler:
             if not self.is_authenticated():
                 return None
             
-            youtube = self.get_authenticated_youtube_service()
-            channels_response = youtube.channels().list(
-                part='snippet',
-                mine=True
-            ).execute()
+            # Repeat workflow runs for the same token skip the channels.list round trip
+            cached = self._user_info_cache
+            if cached and cached[0] == self.credentials.token and time.monotonic() - cached[1] < USER_INFO_CACHE_TTL:
+                return cached[2]
+            
+            channels = self._execute_rest('GET', CHANNELS_URL, _MY_CHANNEL_PARAMS).get('items')
             
-            if channels_response['items']:
-                channel = channels_response['items'][0]
-                return {
+            if channels:
+                channel = channels[0]
+                user_info = {
                     'channel_id': channel['id'],
                     'channel_title': channel['snippet']['title'],
                     'thumbnail_url': channel['snippet']['thumbnails']['default']['url'],
                     'authenticated': True
                 }
+                self._user_info_cache = (self.credentials.token, time.monotonic(), user_info)
+                return user_info
             
             return None
             
@@ -393,11 +679,20 @@ class YouTubeOAuthHandler:
         """Logout user and clear credentials"""
         try:
             self.credentials = None
+            self._credentials_stamp = None
+            self._user_info_cache = None
             
             # Remove stored credentials
-            credentials_file = os.getenv('OAUTH_CREDENTIALS_FILE', 'credentials.json')
-            if os.path.exists(credentials_file):
-                os.remove(credentials_file)
+            if CREDENTIALS_STORE == 'keyring':
+                store = self._get_keyring()
+                try:
+                    store.delete_password(KEYRING_SERVICE, KEYRING_USERNAME)
+                except PasswordDeleteError:
+                    pass  # Nothing stored
+            else:
+                credentials_file = os.getenv('OAUTH_CREDENTIALS_FILE', 'credentials.json')
+                if os.path.exists(credentials_file):
+                    os.remove(credentials_file)
             
             return True
             
@@ -408,91 +703,104 @@ class YouTubeOAuthHandler:
     def _store_credentials(self, credentials: Credentials):
         """Store credentials securely"""
         try:
-            credentials_file = os.getenv('OAUTH_CREDENTIALS_FILE', 'credentials.json')
+            stored = credentials.to_json()
             
-            with open(credentials_file, 'w') as f:
-                f.write(credentials.to_json())
-            
-            # Set restrictive permissions
-            os.chmod(credentials_file, 0o600)
+            if CREDENTIALS_STORE == 'keyring':
+                self._get_keyring().set_password(KEYRING_SERVICE, KEYRING_USERNAME, stored)
+                stamp = stored
+            else:
+                credentials_file = os.getenv('OAUTH_CREDENTIALS_FILE', 'credentials.json')
+                
+                # Write a temp file and swap it in, so a crash mid-write never leaves a truncated file.
+                # mkstemp creates it with restrictive (0600) permissions.
+                fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(credentials_file) or '.', suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        f.write(stored)
+                    os.replace(tmp_file, credentials_file)
+                except BaseException:
+                    os.remove(tmp_file)
+                    raise
+                stamp = os.stat(credentials_file).st_mtime_ns
+            
+            # Our own write already matches the loaded credentials; don't let load_credentials
+            # reparse it and replace the object the services and session were built on
+            if credentials is self.credentials:
+                self._credentials_stamp = stamp
             
         except Exception as e:
             logger.error(f"Error storing credentials: {e}")
     
-    def _store_oauth_state(self, state: str):
-        """Store OAuth state for verification"""
-        try:
-            state_file = os.getenv('OAUTH_STATE_FILE', 'oauth_state.txt')
-            
-            with open(state_file, 'w') as f:
-                f.write(state)
-            
-            os.chmod(state_file, 0o600)
-            
-        except Exception as e:
-            logger.error(f"Error storing OAuth state: {e}")
+    def _get_keyring(self):
+        """Keyring module for OAUTH_CREDENTIALS_STORE=keyring"""
+        if keyring is None:
+            raise RuntimeError("OAUTH_CREDENTIALS_STORE=keyring requires the keyring package (pip install keyring)")
+        return keyring
     
-    def _verify_oauth_state(self, state: str) -> bool:
-        """Verify OAuth state"""
-        try:
-            state_file = os.getenv('OAUTH_STATE_FILE', 'oauth_state.txt')
-            
-            if os.path.exists(state_file):
-                with open(state_file, 'r') as f:
-                    stored_state = f.read().strip()
-                
-                # Clean up state file
-                os.remove(state_file)
-                
-                return state == stored_state
-            
+    def _new_oauth_state(self, session_nonce: str) -> str:
+        """Create an OAuth state value: the session nonce and issue time, signed with the state key"""
+        payload = f"{session_nonce}.{int(time.time())}"
+        return f"{payload}.{self._sign_oauth_state(payload)}"
+    
+    def _sign_oauth_state(self, payload: str) -> str:
+        return hmac.new(self._state_key, payload.encode(), hashlib.sha256).hexdigest()
+    
+    def _verify_oauth_state(self, state: str, session_nonce: Optional[str]) -> bool:
+        """Verify OAuth state signature, age, and that it belongs to this login session"""
+        if not state or not session_nonce:
             return False
-            
-        except Exception as e:
-            logger.error(f"Error verifying OAuth state: {e}")
+        
+        payload, _, signature = state.rpartition('.')
+        if not hmac.compare_digest(signature.encode(), self._sign_oauth_state(payload).encode()):
             return False
+        
+        nonce, _, issued_at = payload.rpartition('.')
+        if not hmac.compare_digest(nonce.encode(), session_nonce.encode()):
+            return False
+        return 0 <= time.time() - int(issued_at) <= OAUTH_STATE_TTL
     
     def _create_flow(self) -> Flow:
-        """Create OAuth flow using environment variables or client secrets file"""
+        """Create OAuth flow from the cached client config"""
         try:
-            # Try to use environment variables first
-            if self.client_id and self.client_secret:
-                client_config = {
-                    "web": {
-                        "client_id": self.client_id,
-                        "client_secret": self.client_secret,
-                        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                        "token_uri": "https://oauth2.googleapis.com/token",
-                        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-                        "redirect_uris": [self.redirect_uri]
-                    }
-                }
-                
-                flow = Flow.from_client_config(
-                    client_config,
-                    scopes=self.scopes
-                )
-                flow.redirect_uri = self.redirect_uri
-                logger.info("Using OAuth credentials from environment variables")
-                return flow
-            
-            # Fall back to client secrets file
-            elif self.client_secrets_file and os.path.exists(self.client_secrets_file):
-                flow = Flow.from_client_secrets_file(
-                    self.client_secrets_file,
-                    scopes=self.scopes,
-                    redirect_uri=self.redirect_uri
-                )
-                logger.info("Using OAuth credentials from client secrets file")
-                return flow
-            
-            else:
-                raise ValueError(
-                    "No valid OAuth configuration found. Please provide either:\n"
-                    "1. GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET environment variables, or\n"
-                    "2. A valid client_secrets.json file"
-                )
+            # Flows hold per-login state (PKCE verifier, fetched token), so only the config is shared
+            return Flow.from_client_config(
+                self._get_client_config(),
+                scopes=self.scopes,
+                redirect_uri=self.redirect_uri
+            )
                 
         except Exception as e:
             logger.error(f"Failed to create OAuth flow: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    def _get_client_config(self) -> Dict[str, Any]:
+        """Build OAuth client config from environment variables or client secrets file, once"""
+        if self._client_config is not None:
+            return self._client_config
+        
+        # Try to use environment variables first
+        if self.client_id and self.client_secret:
+            self._client_config = {
+                "web": {
+                    **_CLIENT_CONFIG_TEMPLATE["web"],
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    "redirect_uris": [self.redirect_uri]
+                }
+            }
+            logger.info("Using OAuth credentials from environment variables")
+        
+        # Fall back to client secrets file
+        elif self.client_secrets_file and os.path.exists(self.client_secrets_file):
+            with open(self.client_secrets_file, 'rb') as f:
+                self._client_config = orjson.loads(f.read())
+            logger.info("Using OAuth credentials from client secrets file")
+        
+        else:
+            raise ValueError(
+                "No valid OAuth configuration found. Please provide either:\n"
+                "1. GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET environment variables, or\n"
+                "2. A valid client_secrets.json file"
+            )
+        
+        return self._client_config
\ No newline at end of file
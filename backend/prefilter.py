@@ -0,0 +1,101 @@
+"""Deterministic screen run before Gemini: decides the obvious cases, sends the rest for review"""
+from typing import Any, Dict, List, Tuple
+import re
+import unicodedata
+
+CLEAN = 'clean'
+SPAM = 'spam'
+REVIEW = 'review'
+
+# Cheap screen for gambling spam signals (keywords, WORD+NUMBERS site names, links).
+# Comments without any hit are marked clean without a Gemini call.
+_QUICK_SPAM_RE = re.compile(
+    r'judi|slot|gacor|maxx?win|zeus|pragmatic|olympus|jackpot|casino|togel|bonus|deposit|daftar|alternatif'
+    r'|\b[a-z]{2,}\d{2,}\b'
+    r'|https?://|www\.',
+    re.IGNORECASE
+)
+
+# Slot slang that only judol promotion uses
+_SLOT_SLANG_RE = re.compile(
+    r'gacor|maxx?win|zeus\s*\d+|pola\s+(?:gacor|zeus|slot)|wd\s+lancar|bonus\s+new\s+member',
+    re.IGNORECASE
+)
+
+# Shouted site names like GACOR77; product names (RTX3080, PES2021) look the same,
+# so these only back up slot slang and never flag a comment on their own
+_SHOUTED_NAME_RE = re.compile(r'\b[A-Z]{3,}\d{2,}\b')
+
+# Distinct strong signals (at least one of them slot slang) needed before a comment is flagged without Gemini
+_OBVIOUS_SPAM_MIN_SIGNALS = 2
+
+# Judol vocabulary and known site names, also used by the keyword fallback when Gemini fails
+GAMBLING_KEYWORDS = (
+    'judi', 'slot', 'casino', 'gacor', 'maxwin', 'maxxwin', 'zeus', 'pragmatic', 'gates of olympus',
+    'bonus deposit', 'putrispin', 'jackpot', 'ironslot', 'main slot', 'main judi', 'main di situs',
+    'pola gacor', 'tempat judi', 'selalu menang', 'wd lancar', 'cuan besar', 'modal receh',
+    'gw jelasin pola', 'gk pernah pakek pola', 'daftar slot', 'link alternatif',
+    'langsung gas', 'auto cuan', 'jam hoki', 'gacor pol', 'dora88', 'sinar88', 'jpdewa',
+    'pintuslot', 'luxury777', 'nagaslot', 'qq77', 'momo4d', 'situs judi', 'situs slot',
+    'klik link slot', 'daftar sekarang', 'bonus new member', 'info slot',
+    'promosi slot', 'akun slot', 'menang terus', 'deposit murah'
+)
+
+# One alternation tells in a single scan whether any keyword occurs at all
+_KEYWORD_RE = re.compile('|'.join(re.escape(keyword) for keyword in GAMBLING_KEYWORDS), re.IGNORECASE)
+
+def keyword_hits(text: str) -> List[str]:
+    """Gambling keywords found in text, counting words inside matched phrases too"""
+    # Most comments have no keyword, so they skip the per-keyword membership tests
+    if not _KEYWORD_RE.search(text):
+        return []
+    lowered = text.lower()
+    return [keyword for keyword in GAMBLING_KEYWORDS if keyword in lowered]
+
+def classify(text: str) -> Tuple[str, List[str]]:
+    """Return (CLEAN | SPAM | REVIEW, matched strong signals) for a comment"""
+    # NFKC folds the styled unicode letters spammers use to dodge filters back to ASCII
+    normalized = unicodedata.normalize('NFKC', text)
+    
+    slang = {match.group().lower() for match in _SLOT_SLANG_RE.finditer(normalized)}
+    signals = sorted(slang | {match.group().lower() for match in _SHOUTED_NAME_RE.finditer(normalized)})
+    if slang and len(signals) >= _OBVIOUS_SPAM_MIN_SIGNALS:
+        return SPAM, signals
+    
+    # Keywords alone can't tell promotion from criticism ("judi slot itu haram"), so Gemini decides
+    if _KEYWORD_RE.search(normalized) or _QUICK_SPAM_RE.search(normalized):
+        return REVIEW, signals
+    
+    # Emoji-heavy comments are a common spam signature
+    if sum(1 for char in normalized if unicodedata.category(char) == 'So') >= 3:
+        return REVIEW, signals
+    
+    return CLEAN, signals
+
+# Most comments are clean, so they all share one verdict instead of a dict (and list) each.
+# Analyses are treated as read-only once attached, like cached Gemini verdicts.
+_CLEAN_ANALYSIS = {
+    'is_spam': False,
+    'confidence': 0.0,
+    'spam_type': 'clean',
+    'reason': "No gambling spam signals found by keyword pre-filter",
+    'detected_patterns': [],
+    'risk_level': 'low',
+    'recommended_action': 'ignore'
+}
+
+def clean_analysis() -> Dict[str, Any]:
+    """Analysis for a comment with no spam signals"""
+    return _CLEAN_ANALYSIS
+
+def spam_analysis(signals: List[str]) -> Dict[str, Any]:
+    """Analysis for a comment carrying several unmistakable judol signals"""
+    return {
+        'is_spam': True,
+        'confidence': 0.95,
+        'spam_type': 'gambling',
+        'reason': f"Keyword pre-filter found multiple gambling spam signals: {signals}",
+        'detected_patterns': signals,
+        'risk_level': 'critical',
+        'recommended_action': 'delete'
+    }
@@ -0,0 +1,117 @@
+from concurrent.futures import Future
+from contextlib import contextmanager
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+from typing import Any, Callable, Dict, Hashable, List, Optional
+import httplib2
+import orjson
+import queue
+import threading
+import time
+
+def ojsonify(obj, status: int = 200) -> Response:
+    """Serialize obj to a JSON response with orjson"""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, used by request.get_json() and jsonify()"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+class HttpPool:
+    """Pool of keep-alive httplib2.Http objects; each one is used by a single thread at a time"""
+    
+    def __init__(self, size: int, timeout: int = 30):
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=size)
+    
+    @contextmanager
+    def checkout(self):
+        """Borrow a connection, creating one if the pool is empty, and return it afterwards"""
+        try:
+            http = self._pool.get_nowait()
+        except queue.Empty:
+            http = httplib2.Http(timeout=self.timeout)
+        try:
+            yield http
+        finally:
+            try:
+                self._pool.put_nowait(http)
+            except queue.Full:
+                http.close()
+
+class TokenBucket:
+    """Thread-safe token bucket: bursts up to capacity, then refills at rate tokens per second"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block only as long as needed to stay under the rate; a rate of 0 disables limiting"""
+        if self.rate <= 0:
+            return
+        tokens = min(tokens, self.capacity)
+        
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+class KeyBatcher:
+    """Coalesces concurrent single-key lookups into bulk calls (the DataLoader pattern)
+    
+    The first caller waits `window` seconds for other threads to join, then resolves
+    every pending key with load_many(keys) -> {key: value}, max_batch keys per call.
+    Keys missing from the result resolve to None.
+    """
+    
+    def __init__(self, load_many: Callable[[List[Hashable]], Dict[Hashable, Any]],
+                 window: float = 0.005, max_batch: int = 50):
+        self._load_many = load_many
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+    
+    def load(self, key: Hashable) -> Any:
+        """Return the value for key, sharing a bulk call with concurrent callers"""
+        with self._lock:
+            leader = not self._pending
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = Future()
+        
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            self._resolve(batch)
+        
+        return future.result()
+    
+    def _resolve(self, batch: Dict[Hashable, Future]) -> None:
+        keys = list(batch)
+        for i in range(0, len(keys), self.max_batch):
+            chunk = keys[i:i + self.max_batch]
+            try:
+                values = self._load_many(chunk)
+            except Exception as e:
+                for key in chunk:
+                    batch[key].set_exception(e)
+            else:
+                for key in chunk:
+                    batch[key].set_result(values.get(key))
@@ -48,17 +48,15 @@ export function AuthStatus({ onAuthChange }: AuthStatusProps) {
     try {
       setLoggingIn(true);
       const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5001';
-      const response = await fetch(`${API_BASE_URL}/api/auth/login`);
-      const data = await response.json();
+      // Open the backend login route in a popup window. It redirects to Google as a top-level
+      // navigation, so the session cookie the OAuth callback checks is first-party.
+      const popup = window.open(
+        `${API_BASE_URL}/api/auth/login`,
+        'oauth',
+        'width=500,height=600,scrollbars=yes,resizable=yes'
+      );
       
-      if (data.auth_url) {
-        // Open OAuth URL in a popup window
-        const popup = window.open(
-          data.auth_url,
-          'oauth',
-          'width=500,height=600,scrollbars=yes,resizable=yes'
-        );
-        
+      if (popup) {
         // Listen for popup close or success
         const checkClosed = setInterval(() => {
           try {